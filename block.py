@@ -1,6 +1,8 @@
 from time import time
 
+from utility.hash_util import hash_block, hash_transactions
 from utility.printable import Printable
+from transaction import Transaction
 
 
 class Block(Printable):
@@ -11,13 +13,69 @@ class Block(Printable):
         :previous_hash: The hash of the previous block in the blockchain.
         :timestamp: The timestamp of the block (automatically generated by
         default).
-        :transactions: A list of transaction which are included in the block.
+        :transactions: A tuple of transaction which are included in the block.
         :proof: The proof of work number that yielded this block.
+
+    Blocks are treated as immutable once created: their hash (and the hash of
+    their transactions) is computed on first use and then cached. The
+    attributes are stored in slots (no per-instance __dict__), use
+    to_dict/from_dict to convert blocks.
     """
+    __slots__ = ('index', 'previous_hash', 'timestamp', 'transactions',
+                 'proof', '__hash', '__transactions_hash')
 
     def __init__(self, index, previous_hash, transactions, proof, time=time()):
         self.index = index
         self.previous_hash = previous_hash
         self.timestamp = time
-        self.transactions = transactions
+        self.transactions = tuple(transactions)
         self.proof = proof
+        self.__hash = None
+        self.__transactions_hash = None
+
+    @property
+    def hash(self):
+        """The (cached) hash of this block."""
+        if self.__hash is None:
+            self.__hash = hash_block(self)
+        return self.__hash
+
+    @property
+    def transactions_hash(self):
+        """The (cached) hash of the transactions of this block."""
+        if self.__transactions_hash is None:
+            self.__transactions_hash = hash_transactions(self.transactions)
+        return self.__transactions_hash
+
+    def header(self):
+        """Returns the compact header of this block: everything but the
+        transactions, which are replaced by their hash."""
+        return {
+            'index': self.index,
+            'previous_hash': self.previous_hash,
+            'timestamp': self.timestamp,
+            'proof': self.proof,
+            'hash': self.hash,
+            'transactions_hash': self.transactions_hash
+        }
+
+    def to_dict(self):
+        """Converts this block into a (JSON serializable) dictionary."""
+        return {
+            'index': self.index,
+            'previous_hash': self.previous_hash,
+            'timestamp': self.timestamp,
+            'transactions': [tx.to_dict() for tx in self.transactions],
+            'proof': self.proof
+        }
+
+    @classmethod
+    def from_dict(cls, block, intern=True):
+        """Creates a block (and its transactions) from a dictionary (see
+        to_dict and Transaction for intern)."""
+        return cls(block['index'],
+                   block['previous_hash'],
+                   [Transaction.from_dict(tx, intern)
+                    for tx in block['transactions']],
+                   block['proof'],
+                   block['timestamp'])
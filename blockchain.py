@@ -1,19 +1,30 @@
-from functools import reduce
+import concurrent.futures
 import hashlib as hl
 
 import json
 import pickle
-import requests
 
-# Import two functions from our hash_util.py file. Omit the ".py" in the import
-from utility.hash_util import hash_block
 from utility.verification import Verification
+from utility.block_log import BlockLog
+from utility.binary_store import BinaryStore
+from utility.mmap_store import MmapStore
+from utility.block_index import BlockIndex
+from utility.transaction_index import TransactionIndex
+from utility.address_index import AddressIndex
+from utility.ledger_file import LedgerFile
+from utility.mining import MiningEngine
+from utility.signature_cache import SignatureCache
+from utility.transaction_pool import TransactionPool
+from utility.peer_client import PeerClient
 from block import Block
 from transaction import Transaction
 from wallet import Wallet
+from ledger import Ledger
 
 # The reward we give to miners (for creating a new block)
 MINING_REWARD = 10
+# The number of seconds resolve waits for the peer nodes
+RESOLVE_TIMEOUT = 30
 
 print(__name__)
 
@@ -24,23 +35,84 @@ class Blockchain:
 
     Attributes:
         :chain: The list of blocks
-        :open_transactions (private): The list of open transactions
+        :open_transactions (private): The open transactions (by ID)
+        :ledger (private): The balances of all participants.
+        :ledger_file (private): The file the ledger and the address index are
+        loaded from.
+        :block_index (private): The heights of the blocks by their hash.
+        :transaction_index (private): The locations of the confirmed
+        transactions by their ID.
+        :address_index (private): The locations of the confirmed
+        transactions by their addresses.
         :hosting_node: The connected node (which runs the blockchain).
     """
 
-    def __init__(self, public_key, node_id):
-        """The constructor of the Blockchain class."""
+    def __init__(self, public_key, node_id, storage='snapshot',
+                 mining_processes=1, mining_mode='lowest',
+                 verify_processes=1, peer_client=None,
+                 broadcast_queue=None):
+        """The constructor of the Blockchain class.
+
+        Arguments:
+            :public_key: The public key of the hosting node.
+            :node_id: The id (port) of the hosting node.
+            :storage: 'snapshot' rewrites the whole data file on every change,
+            'log' appends each change to an append-only log, 'binary' to a
+            compact binary file, 'mmap' keeps the blocks in a memory-mapped
+            file and only loads them when they are accessed (see
+            MmapStore).
+            :mining_processes: The number of processes used for the proof of
+            work.
+            :mining_mode: 'lowest' mines the lowest valid proof, 'first' the
+            first one found by any mining process.
+            :verify_processes: The number of processes used to verify the
+            chains of peer nodes.
+            :peer_client: The PeerClient used to talk to peer nodes (a new
+            one is created by default).
+            :broadcast_queue: A BroadcastQueue which ships broadcasts in the
+            background (by default they are sent before returning).
+        """
         # Our starting block for the blockchain
         genesis_block = Block(0, '', [], 100, 0)
+        # The ledger and the address index are updated whenever the chain
+        # changes (and loaded from the ledger file when the node starts)
+        self.__ledger = Ledger()
+        self.__address_index = AddressIndex()
+        self.__ledger_file = LedgerFile('blockchain-{}.ledger'.format(node_id),
+                                        self.__ledger, self.__address_index)
         # Initializing our (empty) blockchain list
         self.chain = [genesis_block]
         # Unhandled transactions
-        self.__open_transactions = []
+        self.__open_transactions = TransactionPool()
+        # Transactions whose signature was already verified
+        self.__verified_signatures = SignatureCache()
         self.public_key = public_key
         self.__peer_nodes = set()
         self.node_id = node_id
         self.resolve_conflicts = False
+        self.mining_processes = mining_processes
+        self.mining_mode = mining_mode
+        self.verify_processes = verify_processes
+        if peer_client is None:
+            peer_client = PeerClient()
+        self.__peer_client = peer_client
+        self.__broadcast_queue = broadcast_queue
+        # Snapshots are written by save_data itself, the other storages are
+        # handled by a store object
+        if storage == 'log':
+            self.__store = BlockLog('blockchain-{}.log'.format(node_id))
+        elif storage == 'binary':
+            self.__store = BinaryStore('blockchain-{}.bin'.format(node_id))
+        elif storage == 'mmap':
+            self.__store = MmapStore('blockchain-{}'.format(node_id))
+        else:
+            self.__store = None
+        self.__block_index = BlockIndex(
+            'blockchain-{}.hashes'.format(node_id))
+        self.__transaction_index = TransactionIndex(
+            'blockchain-{}.txindex'.format(node_id))
         self.load_data()
+        self.__rebuild_indexes()
 
     # This turns the chain attribute into a property with a getter (the method
     # below) and a setter (@chain.setter)
@@ -53,12 +125,46 @@ class Blockchain:
     def chain(self, val):
         self.__chain = val
 
+    def iter_blocks(self, start=0, stop=None):
+        """Yield the blocks from index start up to (excluding) index stop
+        one at a time without copying the chain.
+
+        Arguments:
+            :start: The index of the first block.
+            :stop: The index after the last block (defaults to the end of the
+            chain).
+        """
+        # Keep iterating the same chain even if it's replaced meanwhile
+        chain = self.__chain
+        if stop is None or stop > len(chain):
+            stop = len(chain)
+        for index in range(start, stop):
+            yield chain[index]
+
+    def __rebuild_indexes(self):
+        """Load the ledger and the indexes for the current chain (their files
+        are reused for the blocks they have in common with the chain)."""
+        self.__ledger_file.rebuild(self.__chain)
+        self.__block_index.rebuild(self.__chain)
+        self.__transaction_index.rebuild(self.__chain)
+
     def get_open_transactions(self):
         """Returns a copy of the open transactions list."""
-        return self.__open_transactions[:]
+        return list(self.__open_transactions)
+
+    def __set_open_transactions(self, transactions):
+        """Replace the open transactions (and their pending amounts)."""
+        self.__open_transactions = TransactionPool(transactions)
+        self.__ledger.rebuild_pending(transactions)
 
     def load_data(self):
         """Initialize blockchain + open transactions data from a file."""
+        if self.__store is not None:
+            data = self.__store.load()
+            if data is not None:
+                self.chain, open_transactions, self.__peer_nodes = data
+                self.__set_open_transactions(open_transactions)
+                return
         try:
             with open('blockchain-{}.txt'.format(self.node_id), mode='r') as f:
                 # file_content = pickle.loads(f.read())
@@ -68,57 +174,38 @@ class Blockchain:
                 blockchain = json.loads(file_content[0][:-1])
                 # We need to convert  the loaded data because Transactions
                 # should use OrderedDict
-                updated_blockchain = []
-                for block in blockchain:
-                    converted_tx = [Transaction(
-                        tx['sender'],
-                        tx['recipient'],
-                        tx['signature'],
-                        tx['amount']) for tx in block['transactions']]
-                    updated_block = Block(
-                        block['index'],
-                        block['previous_hash'],
-                        converted_tx,
-                        block['proof'],
-                        block['timestamp'])
-                    updated_blockchain.append(updated_block)
-                self.chain = updated_blockchain
+                self.chain = [Block.from_dict(block) for block in blockchain]
                 open_transactions = json.loads(file_content[1][:-1])
                 # We need to convert  the loaded data because Transactions
                 # should use OrderedDict
-                updated_transactions = []
-                for tx in open_transactions:
-                    updated_transaction = Transaction(
-                        tx['sender'],
-                        tx['recipient'],
-                        tx['signature'],
-                        tx['amount'])
-                    updated_transactions.append(updated_transaction)
-                self.__open_transactions = updated_transactions
+                self.__set_open_transactions(
+                    [Transaction.from_dict(tx) for tx in open_transactions])
                 peer_nodes = json.loads(file_content[2])
                 self.__peer_nodes = set(peer_nodes)
         except (IOError, IndexError):
             pass
         finally:
             print('Cleanup!')
+        if self.__store is not None:
+            # Start a new store with a snapshot of the data loaded so far
+            self.save_data()
 
     def save_data(self):
         """Save blockchain + open transactions snapshot to a file."""
+        if self.__store is not None:
+            # The store returns the chain to keep (the same blocks, which may
+            # be loaded lazily from the store)
+            self.__chain = self.__store.snapshot(self.__chain,
+                                                 self.get_open_transactions(),
+                                                 self.__peer_nodes)
+            return
         try:
             with open('blockchain-{}.txt'.format(self.node_id), mode='w') as f:
-                saveable_chain = [
-                    block.__dict__ for block in
-                    [
-                        Block(block_el.index,
-                              block_el.previous_hash,
-                              [tx.__dict__ for tx in block_el.transactions],
-                              block_el.proof,
-                              block_el.timestamp) for block_el in self.__chain
-                    ]
-                ]
+                saveable_chain = [block.to_dict() for block in self.__chain]
                 f.write(json.dumps(saveable_chain))
                 f.write('\n')
-                saveable_tx = [tx.__dict__ for tx in self.__open_transactions]
+                saveable_tx = [tx.to_dict()
+                               for tx in self.__open_transactions]
                 f.write(json.dumps(saveable_tx))
                 f.write('\n')
                 f.write(json.dumps(list(self.__peer_nodes)))
@@ -130,22 +217,47 @@ class Blockchain:
         except IOError:
             print('Saving failed!')
 
-    def proof_of_work(self):
+    def __save_block(self, block):
+        """Persist a block which was just appended to the chain."""
+        if self.__store is None:
+            self.save_data()
+        else:
+            self.__store.append_block(block)
+
+    def __save_transaction(self, transaction):
+        """Persist a transaction which was just added to the open
+        transactions."""
+        if self.__store is None:
+            self.save_data()
+        else:
+            self.__store.append_transaction(transaction)
+
+    def __save_peer_node(self, node, removed=False):
+        """Persist the addition (or removal) of a peer node."""
+        if self.__store is None:
+            self.save_data()
+        else:
+            self.__store.append_peer(node, removed)
+
+    def proof_of_work(self, processes=None):
         """Generate a proof of work for the open transactions, the hash of the
-        previous block and a random number (which is guessed until it fits)."""
-        last_block = self.__chain[-1]
-        last_hash = hash_block(last_block)
-        proof = 0
+        previous block and a random number (which is guessed until it fits).
+
+        Arguments:
+            :processes: The number of mining processes (defaults to the
+            mining_processes of the blockchain).
+        """
+        if processes is None:
+            processes = self.mining_processes
+        last_hash = self.__chain[-1].hash
+        engine = MiningEngine.for_block(self.get_open_transactions(),
+                                        last_hash)
         # Try different PoW numbers and return the first valid one
-        while not Verification.valid_proof(
-            self.__open_transactions,
-            last_hash, proof
-        ):
-            proof += 1
-        return proof
+        return engine.parallel_search(processes,
+                                      lowest=self.mining_mode == 'lowest')
 
     def get_balance(self, sender=None):
-        """Calculate and return the balance for a participant.
+        """Return the balance for a participant (looked up in the ledger).
         """
         if sender is None:
             if self.public_key is None:
@@ -153,43 +265,20 @@ class Blockchain:
             participant = self.public_key
         else:
             participant = sender
-        # Fetch a list of all sent coin amounts for the given person (empty
-        # lists are returned if the person was NOT the sender)
-        # This fetches sent amounts of transactions that were already included
-        # in blocks of the blockchain
-        tx_sender = [[tx.amount for tx in block.transactions
-                      if tx.sender == participant] for block in self.__chain]
-        # Fetch a list of all sent coin amounts for the given person (empty
-        # lists are returned if the person was NOT the sender)
-        # This fetches sent amounts of open transactions (to avoid double
-        # spending)
-        open_tx_sender = [
-            tx.amount for tx in self.__open_transactions
-            if tx.sender == participant
-        ]
-        tx_sender.append(open_tx_sender)
-        print(tx_sender)
-        amount_sent = reduce(lambda tx_sum, tx_amt: tx_sum + sum(tx_amt)
-                             if len(tx_amt) > 0 else tx_sum + 0, tx_sender, 0)
-        # This fetches received coin amounts of transactions that were already
-        # included in blocks of the blockchain
-        # We ignore open transactions here because you shouldn't be able to
-        # spend coins before the transaction was confirmed + included in a
-        # block
-        tx_recipient = [
-            [
-                tx.amount for tx in block.transactions
-                if tx.recipient == participant
-            ] for block in self.__chain
-        ]
-        amount_received = reduce(
-            lambda tx_sum, tx_amt: tx_sum + sum(tx_amt)
-            if len(tx_amt) > 0 else tx_sum + 0,
-            tx_recipient,
-            0
-        )
-        # Return the total balance
-        return amount_received - amount_sent
+        return self.__ledger.get_balance(participant)
+
+    def get_balance_at(self, participant, height):
+        """Return the confirmed balance of a participant after the block at
+        the given height (None if there is no such block).
+
+        Arguments:
+            :participant: The public key of the participant.
+            :height: The index of the block.
+        """
+        if height < 0 or height >= len(self.__chain):
+            return None
+        return self.__ledger.get_balance_at(participant, height,
+                                            self.__chain)
 
     def get_last_blockchain_value(self):
         """ Returns the last value of the current blockchain. """
@@ -197,6 +286,82 @@ class Blockchain:
             return None
         return self.__chain[-1]
 
+    def get_chain_length(self):
+        """Returns the number of blocks in the chain (without copying it)."""
+        return len(self.__chain)
+
+    def get_block(self, index):
+        """Returns the block at the given index (None if there is no such
+        block) without copying the chain.
+
+        Arguments:
+            :index: The index of the block.
+        """
+        if index < 0 or index >= len(self.__chain):
+            return None
+        return self.__chain[index]
+
+    def get_block_by_hash(self, block_hash):
+        """Returns the block with the given hash (None if there is no such
+        block) using the block index.
+
+        Arguments:
+            :block_hash: The hash of the block.
+        """
+        height = self.__block_index.get_height(block_hash)
+        if height is None:
+            return None
+        return self.get_block(height)
+
+    def get_transaction(self, transaction_id):
+        """Returns a (transaction, locations, open_count) tuple for the
+        transactions with the given ID or None if there is no such
+        transaction.
+
+        Repeated payments (and the rewards of the same miner) have the same
+        ID, so locations holds the (height, position) tuples of all
+        confirmed transactions with the ID (in the order of the chain) and
+        open_count the number of open ones.
+
+        Arguments:
+            :transaction_id: The ID of the transaction.
+        """
+        transaction = self.__open_transactions.get(transaction_id)
+        open_count = self.__open_transactions.count(transaction_id)
+        locations = self.__transaction_index.get_locations(transaction_id)
+        if transaction is None and locations:
+            (height, position) = locations[0]
+            block = self.get_block(height)
+            if block is not None:
+                transaction = block.transactions[position]
+        if transaction is None:
+            return None
+        return transaction, locations, open_count
+
+    def get_address_transactions(self, address, offset=0, limit=None):
+        """Returns (transaction, height, position) tuples for the confirmed
+        transactions an address sent or received (in the order of the
+        chain) using the address index.
+
+        Arguments:
+            :address: The address (public key).
+            :offset: The number of transactions to skip.
+            :limit: The maximum number of transactions (all by default).
+        """
+        transactions = []
+        for (height, position) in self.__address_index.get_locations(
+                address, offset, limit):
+            block = self.get_block(height)
+            if block is not None:
+                transactions.append(
+                    (block.transactions[position], height, position))
+        return transactions
+
+    def get_address_transaction_count(self, address):
+        """Returns the number of confirmed transactions an address sent or
+        received."""
+        return self.__address_index.count(address)
+
     # This function accepts two arguments.
     # One required one (transaction_amount) and one optional one
     # (last_transaction)
@@ -223,40 +388,43 @@ class Blockchain:
         # }
         # if self.public_key == None:
         #     return False
-        transaction = Transaction(sender, recipient, signature, amount)
+        # The addresses are only interned once the transaction is accepted
+        transaction = Transaction(sender, recipient, signature, amount,
+                                  intern=False)
         if Verification.verify_transaction(transaction, self.get_balance):
-            self.__open_transactions.append(transaction)
-            self.save_data()
+            transaction.intern_addresses()
+            self.__verified_signatures.add(transaction)
+            self.__open_transactions.add(transaction)
+            self.__ledger.add_pending(transaction)
+            self.__save_transaction(transaction)
             if not is_receiving:
-                for node in self.__peer_nodes:
-                    url = 'http://{}/broadcast-transaction'.format(node)
-                    try:
-                        response = requests.post(url,
-                                                 json={
-                                                     'sender': sender,
-                                                     'recipient': recipient,
-                                                     'amount': amount,
-                                                     'signature': signature
-                                                 })
-                        if (response.status_code == 400 or
-                                response.status_code == 500):
-                            print('Transaction declined, needs resolving')
-                            return False
-                    except requests.exceptions.ConnectionError:
-                        continue
+                return self.__broadcast(
+                    '/broadcast-transaction',
+                    {
+                        'sender': sender,
+                        'recipient': recipient,
+                        'amount': amount,
+                        'signature': signature
+                    },
+                    self.__handle_transaction_responses)
             return True
         return False
 
-    def mine_block(self):
-        """Create a new block and add open transactions to it."""
+    def mine_block(self, processes=None):
+        """Create a new block and add open transactions to it.
+
+        Arguments:
+            :processes: The number of mining processes (defaults to the
+            mining_processes of the blockchain).
+        """
         # Fetch the currently last block of the blockchain
         if self.public_key is None:
             return None
         last_block = self.__chain[-1]
-        # Hash the last block (=> to be able to compare it to the stored hash
-        # value)
-        hashed_block = hash_block(last_block)
-        proof = self.proof_of_work()
+        # The hash of the last block (=> to be able to compare it to the
+        # stored hash value)
+        hashed_block = last_block.hash
+        proof = self.proof_of_work(processes)
         # Miners should be rewarded, so let's create a reward transaction
         # reward_transaction = {
         #     'sender': 'MINING',
@@ -269,49 +437,79 @@ class Blockchain:
         # open_transactions list
         # This ensures that if for some reason the mining should fail,
         # we don't have the reward transaction stored in the open transactions
-        copied_transactions = self.__open_transactions[:]
+        copied_transactions = self.get_open_transactions()
         for tx in copied_transactions:
-            if not Wallet.verify_transaction(tx):
+            # Transactions verified in add_transaction are not verified again
+            if (tx not in self.__verified_signatures and
+                    not Wallet.verify_transaction(tx)):
                 return None
         copied_transactions.append(reward_transaction)
         block = Block(len(self.__chain), hashed_block,
                       copied_transactions, proof)
         self.__chain.append(block)
-        self.__open_transactions = []
-        self.save_data()
-        for node in self.__peer_nodes:
-            url = 'http://{}/broadcast-block'.format(node)
-            converted_block = block.__dict__.copy()
-            converted_block['transactions'] = [
-                tx.__dict__ for tx in converted_block['transactions']]
-            try:
-                response = requests.post(url, json={'block': converted_block})
-                if response.status_code == 400 or response.status_code == 500:
-                    print('Block declined, needs resolving')
-                if response.status_code == 409:
-                    self.resolve_conflicts = True
-            except requests.exceptions.ConnectionError:
-                continue
+        self.__open_transactions = TransactionPool()
+        self.__ledger_file.add(block)
+        self.__block_index.add(block)
+        self.__transaction_index.add(block)
+        self.__ledger.clear_pending()
+        for tx in block.transactions:
+            self.__verified_signatures.discard(tx)
+        self.__save_block(block)
+        self.__broadcast('/broadcast-block', {'block': block.to_dict()},
+                         self.__handle_block_responses)
         return block
 
+    def __broadcast(self, path, payload, handle_responses):
+        """Send a broadcast to all peer nodes and return the result of
+        handle_responses (True if the broadcast is shipped in the
+        background)."""
+        if self.__broadcast_queue is None:
+            return handle_responses(self.__peer_client.broadcast(
+                self.__peer_nodes, path, payload))
+        if not self.__broadcast_queue.put(self.__peer_nodes, path, payload,
+                                          handle_responses):
+            print('Broadcast queue is full, broadcast dropped')
+        return True
+
+    def __handle_transaction_responses(self, responses):
+        """Return False if a peer node declined a broadcast transaction."""
+        for response in responses.values():
+            # Unreachable peers are skipped
+            if response is None:
+                continue
+            if response.status_code == 400 or response.status_code == 500:
+                print('Transaction declined, needs resolving')
+                return False
+        return True
+
+    def __handle_block_responses(self, responses):
+        """Check the answers of peer nodes to a broadcast block."""
+        for response in responses.values():
+            # Unreachable peers are skipped
+            if response is None:
+                continue
+            if response.status_code == 400 or response.status_code == 500:
+                print('Block declined, needs resolving')
+            if response.status_code == 409:
+                self.resolve_conflicts = True
+
     def add_block(self, block):
         """Add a block which was received via broadcasting to the localb
         lockchain."""
         # Create a list of transaction objects
-        transactions = [Transaction(
-            tx['sender'],
-            tx['recipient'],
-            tx['signature'],
-            tx['amount']) for tx in block['transactions']]
+        transactions = [Transaction.from_dict(tx, intern=False)
+                        for tx in block['transactions']]
         # Validate the proof of work of the block and store the result (True
         # or False) in a variable
         proof_is_valid = Verification.valid_proof(
             transactions[:-1], block['previous_hash'], block['proof'])
         # Check if previous_hash stored in the block is equal to the local
         # blockchain's last block's hash and store the result in a block
-        hashes_match = hash_block(self.chain[-1]) == block['previous_hash']
+        hashes_match = self.__chain[-1].hash == block['previous_hash']
         if not proof_is_valid or not hashes_match:
             return False
+        for tx in transactions:
+            tx.intern_addresses()
         # Create a Block object
         converted_block = Block(
             block['index'],
@@ -320,70 +518,153 @@ class Blockchain:
             block['proof'],
             block['timestamp'])
         self.__chain.append(converted_block)
-        stored_transactions = self.__open_transactions[:]
-        # Check which open transactions were included in the received block
-        # and remove them
-        # This could be improved by giving each transaction an ID that would
-        # uniquely identify it
-        for itx in block['transactions']:
-            for opentx in stored_transactions:
-                if (opentx.sender == itx['sender'] and
-                        opentx.recipient == itx['recipient'] and
-                        opentx.amount == itx['amount'] and
-                        opentx.signature == itx['signature']):
-                    try:
-                        self.__open_transactions.remove(opentx)
-                    except ValueError:
-                        print('Item was already removed')
-        self.save_data()
+        self.__ledger_file.add(converted_block)
+        self.__block_index.add(converted_block)
+        self.__transaction_index.add(converted_block)
+        # Remove the open transactions which were included in the received
+        # block
+        for tx in transactions:
+            self.__verified_signatures.discard(tx)
+            opentx = self.__open_transactions.remove(tx.id)
+            if opentx is not None:
+                self.__ledger.remove_pending(opentx)
+        self.__save_block(converted_block)
         return True
 
     def resolve(self):
         """Checks all peer nodes' blockchains and replaces the local one with
-        longer valid ones."""
-        # Initialize the winner chain with the local chain
-        winner_chain = self.chain
+        the first longer valid one which is found."""
+        local_chain = self.chain
+        # The headers of all peer chains are downloaded concurrently (with
+        # the timeouts of the peer client)
+        futures = [
+            self.__peer_client.submit(self.__fetch_longer_headers,
+                                      node, local_chain)
+            for node in self.__peer_nodes
+        ]
         replace = False
-        for node in self.__peer_nodes:
-            url = 'http://{}/chain'.format(node)
-            try:
-                # Send a request and store the response
-                response = requests.get(url)
-                # Retrieve the JSON data as a dictionary
-                node_chain = response.json()
-                # Convert the dictionary list to a list of block AND
-                # transaction objects
-                node_chain = [
-                    Block(block['index'],
-                          block['previous_hash'],
-                          [
-                        Transaction(
-                            tx['sender'],
-                            tx['recipient'],
-                            tx['signature'],
-                            tx['amount']) for tx in block['transactions']
-                    ],
-                        block['proof'],
-                        block['timestamp']) for block in node_chain
-                ]
-                node_chain_length = len(node_chain)
-                local_chain_length = len(winner_chain)
-                # Store the received chain as the current winner chain if it's
-                # longer AND valid
-                if (node_chain_length > local_chain_length and
-                        Verification.verify_chain(node_chain)):
-                    winner_chain = node_chain
+        try:
+            # The blocks of a longer chain are downloaded and verified as soon
+            # as its headers arrived
+            for future in concurrent.futures.as_completed(
+                    futures, timeout=RESOLVE_TIMEOUT):
+                candidate = future.result()
+                if candidate is None:
+                    continue
+                (node, start, headers) = candidate
+                blocks = self.__fetch_blocks(node, local_chain, start,
+                                             headers)
+                if blocks is not None:
+                    # A longer valid chain was found, the other peer nodes
+                    # aren't needed anymore
                     replace = True
-            except requests.exceptions.ConnectionError:
-                continue
+                    break
+        except concurrent.futures.TimeoutError:
+            print('Peer nodes took too long to answer')
+        finally:
+            for future in futures:
+                future.cancel()
         self.resolve_conflicts = False
-        # Replace the local chain with the winner chain
-        self.chain = winner_chain
         if replace:
-            self.__open_transactions = []
-        self.save_data()
+            # Replace the local chain with the winner chain
+            self.__open_transactions = TransactionPool()
+            self.__ledger.clear_pending()
+            self.__verified_signatures.clear()
+            self.__replace_blocks(start, blocks)
+            self.__rebuild_indexes()
         return replace
 
+    def __replace_blocks(self, start, blocks):
+        """Replace the blocks of the chain from index start on (e.g. with the
+        blocks of another fork) and save the data."""
+        if isinstance(self.__store, MmapStore):
+            # The blocks before start stay in the files of the store, only
+            # the new blocks are written
+            self.__chain = self.__store.truncate(
+                start, self.get_open_transactions(), self.__peer_nodes)
+            for block in blocks:
+                self.__chain.append(block)
+            return
+        self.__chain = self.__chain[:start] + blocks
+        self.save_data()
+
+    def __fetch_longer_headers(self, node, chain):
+        """Download the block headers of a peer node's chain and return a
+        (node, start, headers) tuple if its chain is longer than the given
+        chain and the headers are consistent (None otherwise).
+
+        Only the headers after the last block both chains have in common
+        (which is at index start - 1) are downloaded.
+
+        Arguments:
+            :node: The URL of the peer node.
+            :chain: The chain to compare with.
+        """
+        try:
+            response = self.__peer_client.get(node, '/chain/tip')
+            if response is None or response.status_code != 200:
+                return None
+            if response.json()['length'] <= len(chain):
+                return None
+            # Start with the blocks missing locally and move the start back
+            # (doubling the step) until the headers connect to the chain
+            start = len(chain)
+            step = 1
+            while True:
+                response = self.__peer_client.get(
+                    node, '/headers/from/{}'.format(start))
+                if response is None or response.status_code != 200:
+                    return None
+                headers = response.json()
+                if not headers or headers[0]['index'] != start:
+                    return None
+                if (start == 0 or
+                        headers[0]['previous_hash'] == chain[start - 1].hash):
+                    break
+                start = max(0, start - step)
+                step *= 2
+            if start + len(headers) <= len(chain):
+                return None
+            # The headers have to form a chain (their hashes are checked once
+            # the blocks are downloaded)
+            for (previous, header) in zip(headers, headers[1:]):
+                if (header['index'] != previous['index'] + 1 or
+                        header['previous_hash'] != previous['hash']):
+                    return None
+        except (ValueError, KeyError, TypeError):
+            print('Invalid headers from {}'.format(node))
+            return None
+        return node, start, headers
+
+    def __fetch_blocks(self, node, chain, start, headers):
+        """Download the blocks of a peer node's chain for the given headers
+        (see __fetch_longer_headers) and return them if they are valid and
+        connect to the given chain at index start (None otherwise)."""
+        try:
+            response = self.__peer_client.get(
+                node, '/chain', {'offset': start, 'limit': len(headers)})
+            if response is None or response.status_code != 200:
+                return None
+            blocks = [Block.from_dict(block, intern=False)
+                      for block in response.json()['blocks']]
+        except (ValueError, KeyError, TypeError):
+            print('Invalid chain data from {}'.format(node))
+            return None
+        # The blocks have to match the headers they were chosen for
+        if [block.header() for block in blocks] != headers:
+            return None
+        # The common blocks were verified before, so only the new ones (and
+        # their link to the common blocks) are verified
+        if Verification.find_invalid_block(
+                list(chain[max(0, start - 1):start]) + blocks,
+                self.verify_processes) is not None:
+            return None
+        # The new blocks are valid, so their addresses are interned now
+        for block in blocks:
+            for tx in block.transactions:
+                tx.intern_addresses()
+        return blocks
+
     def add_peer_node(self, node):
         """Adds a new node to the peer node set.
 
@@ -391,7 +672,7 @@ class Blockchain:
             :node: The node URL which should be added.
         """
         self.__peer_nodes.add(node)
-        self.save_data()
+        self.__save_peer_node(node)
 
     def remove_peer_node(self, node):
         """Removes a node from the peer node set.
@@ -400,8 +681,13 @@ class Blockchain:
             :node: The node URL which should be removed.
         """
         self.__peer_nodes.discard(node)
-        self.save_data()
+        self.__save_peer_node(node, removed=True)
 
     def get_peer_nodes(self):
         """Return a list of all connected peer nodes."""
         return list(self.__peer_nodes)
+
+    def get_peer_stats(self):
+        """Return the request, failure and latency statistics of all peer
+        nodes."""
+        return self.__peer_client.get_stats()
@@ -0,0 +1,147 @@
+from bisect import bisect_right
+
+from utility.address_table import addresses
+
+# The number of blocks between two balance checkpoints
+CHECKPOINT_INTERVAL = 100
+
+
+class Ledger:
+    """Keeps track of the balances of all participants so that a balance can
+    be looked up without scanning the blockchain.
+
+    Confirmed amounts are updated whenever a block is appended to the chain,
+    amounts sent with open transactions are kept apart (and subtracted from
+    the balance to avoid double spending). Participants are stored by their
+    address ID (see AddressTable).
+
+    Every checkpoint_interval blocks a checkpoint records the confirmed
+    amounts of the participants whose amounts changed since the previous
+    checkpoint, so that the balance at an earlier height only requires a
+    replay of the blocks after the nearest checkpoint.
+    """
+
+    def __init__(self, checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.checkpoint_interval = checkpoint_interval
+        self.__received = {}
+        self.__sent = {}
+        self.__pending = {}
+        # The number of blocks added so far
+        self.__height = 0
+        # The checkpoints of every participant as a (heights, amounts) tuple:
+        # the number of blocks covered by a checkpoint and the (received,
+        # sent) amounts after them
+        self.__checkpoints = {}
+        # The participants whose amounts changed since the last checkpoint
+        self.__changed = set()
+
+    def rebuild(self, chain):
+        """Recalculate the confirmed amounts from a whole chain.
+
+        Arguments:
+            :chain: The blocks of the blockchain.
+        """
+        self.__received = {}
+        self.__sent = {}
+        self.__height = 0
+        self.__checkpoints = {}
+        self.__changed = set()
+        for block in chain:
+            self.add_block(block)
+
+    def rebuild_pending(self, open_transactions):
+        """Recalculate the pending amounts from the open transactions.
+
+        Arguments:
+            :open_transactions: The open transactions.
+        """
+        self.__pending = {}
+        for tx in open_transactions:
+            self.add_pending(tx)
+
+    def add_block(self, block):
+        """Add the amounts of a block which was appended to the chain.
+
+        Arguments:
+            :block: The appended block.
+        """
+        for tx in block.transactions:
+            self.__sent[tx.sender_id] = (
+                self.__sent.get(tx.sender_id, 0) + tx.amount)
+            self.__received[tx.recipient_id] = (
+                self.__received.get(tx.recipient_id, 0) + tx.amount)
+            self.__changed.add(tx.sender_id)
+            self.__changed.add(tx.recipient_id)
+        self.__height += 1
+        if self.__height % self.checkpoint_interval == 0:
+            for participant in self.__changed:
+                (heights, amounts) = self.__checkpoints.setdefault(
+                    participant, ([], []))
+                heights.append(self.__height)
+                amounts.append((self.__received.get(participant, 0),
+                                self.__sent.get(participant, 0)))
+            self.__changed = set()
+
+    def add_pending(self, transaction):
+        """Add the amount of a new open transaction."""
+        self.__pending.setdefault(transaction.sender_id, []).append(
+            transaction.amount)
+
+    def remove_pending(self, transaction):
+        """Remove the amount of an open transaction (e.g. after it was
+        confirmed)."""
+        amounts = self.__pending.get(transaction.sender_id, [])
+        if transaction.amount in amounts:
+            amounts.remove(transaction.amount)
+        if not amounts:
+            self.__pending.pop(transaction.sender_id, None)
+
+    def clear_pending(self):
+        """Remove the amounts of all open transactions."""
+        self.__pending = {}
+
+    def get_balance(self, participant):
+        """Return the balance of a participant: the received minus the sent
+        amounts (including the amounts of open transactions).
+
+        Arguments:
+            :participant: The public key of the participant.
+        """
+        participant = addresses.get_id(participant)
+        amount_sent = (self.__sent.get(participant, 0) +
+                       sum(self.__pending.get(participant, [])))
+        return self.__received.get(participant, 0) - amount_sent
+
+    def get_balance_at(self, participant, height, chain):
+        """Return the confirmed balance of a participant after the block at
+        the given height (open transactions aren't included).
+
+        Arguments:
+            :participant: The public key of the participant.
+            :height: The index of the block.
+            :chain: The blocks of the blockchain (the blocks after the
+            nearest checkpoint are replayed).
+        """
+        participant = addresses.get_id(participant)
+        if participant is None:
+            return 0
+        # The nearest checkpoint covers the blocks before start
+        start = min((height + 1) // self.checkpoint_interval,
+                    self.__height // self.checkpoint_interval)
+        start *= self.checkpoint_interval
+        # The participant's last checkpoint up to start holds its amounts
+        # (they didn't change at the checkpoints after it)
+        (heights, amounts) = self.__checkpoints.get(participant, ([], []))
+        checkpoint = bisect_right(heights, start)
+        if checkpoint > 0:
+            (received, sent) = amounts[checkpoint - 1]
+            balance = received - sent
+        else:
+            balance = 0
+        for index in range(start, height + 1):
+            for tx in chain[index].transactions:
+                if tx.sender_id == participant:
+                    balance -= tx.amount
+                if tx.recipient_id == participant:
+                    balance += tx.amount
+        return balance
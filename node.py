@@ -1,11 +1,41 @@
-from flask import Flask, jsonify, request, send_from_directory
+import json
+import os
+import signal
+
+from flask import (Flask, Response, jsonify, request, send_from_directory,
+                   stream_with_context)
 from flask_cors import CORS
 
 from wallet import Wallet
 from blockchain import Blockchain
+from utility.peer_client import PeerClient, PEER_TIMEOUT
+from utility.broadcast_queue import BroadcastQueue
+from utility.chain_cache import ChainCache
 
 app = Flask(__name__)
 CORS(app)
+chain_cache = ChainCache()
+
+# The accepted values of boolean query arguments
+BOOLEAN_VALUES = {
+    '1': True, 'true': True, 'yes': True, 'on': True,
+    '0': False, 'false': False, 'no': False, 'off': False, '': False
+}
+
+
+def get_page_args():
+    """Return the offset and limit query arguments of a paginated request as
+    an (offset, limit) tuple (None if they aren't non-negative integers)."""
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = request.args.get('limit')
+        if limit is not None:
+            limit = int(limit)
+    except ValueError:
+        return None
+    if offset < 0 or (limit is not None and limit < 0):
+        return None
+    return offset, limit
 
 
 @app.route('/', methods=['GET'])
@@ -23,7 +53,7 @@ def create_keys():
     wallet.create_keys()
     if wallet.save_keys():
         global blockchain
-        blockchain = Blockchain(wallet.public_key, port)
+        blockchain = Blockchain(wallet.public_key, port, **blockchain_options)
         response = {
             'public_key': wallet.public_key,
             'private_key': wallet.private_key,
@@ -41,7 +71,7 @@ def create_keys():
 def load_keys():
     if wallet.load_keys():
         global blockchain
-        blockchain = Blockchain(wallet.public_key, port)
+        blockchain = Blockchain(wallet.public_key, port, **blockchain_options)
         response = {
             'public_key': wallet.public_key,
             'private_key': wallet.private_key,
@@ -72,6 +102,24 @@ def get_balance():
         return jsonify(response), 500
 
 
+@app.route('/balance/<int:height>', methods=['GET'])
+def get_balance_at(height):
+    address = request.args.get('address', wallet.public_key)
+    if address is None:
+        response = {'message': 'No address given and no wallet set up.'}
+        return jsonify(response), 400
+    balance = blockchain.get_balance_at(address, height)
+    if balance is None:
+        response = {'message': 'Block not found.'}
+        return jsonify(response), 404
+    response = {
+        'address': address,
+        'block_index': height,
+        'funds': balance
+    }
+    return jsonify(response), 200
+
+
 @app.route('/broadcast-transaction', methods=['POST'])
 def broadcast_transaction():
     values = request.get_json()
@@ -116,14 +164,15 @@ def broadcast_block():
         response = {'message': 'Some data is missing.'}
         return jsonify(response), 400
     block = values['block']
-    if block['index'] == blockchain.chain[-1].index + 1:
+    last_block = blockchain.get_last_blockchain_value()
+    if block['index'] == last_block.index + 1:
         if blockchain.add_block(block):
             response = {'message': 'Block added'}
             return jsonify(response), 201
         else:
             response = {'message': 'Block seems invalid.'}
             return jsonify(response), 409
-    elif block['index'] > blockchain.chain[-1].index:
+    elif block['index'] > last_block.index:
         response = {
             'message': 'Blockchain seems to differ from local blockchain.'}
         blockchain.resolve_conflicts = True
@@ -182,11 +231,18 @@ def mine():
     if blockchain.resolve_conflicts:
         response = {'message': 'Resolve conflicts first, block not added!'}
         return jsonify(response), 409
-    block = blockchain.mine_block()
+    values = request.get_json(silent=True) or {}
+    processes = values.get('processes') if isinstance(values, dict) else None
+    # The number of mining processes is limited to the number of CPUs
+    max_processes = os.cpu_count() or 1
+    if processes is not None and (type(processes) is not int or
+                                  not 1 <= processes <= max_processes):
+        response = {'message': 'processes must be a number from 1 to {}.'
+                    .format(max_processes)}
+        return jsonify(response), 400
+    block = blockchain.mine_block(processes)
     if block is not None:
-        dict_block = block.__dict__.copy()
-        dict_block['transactions'] = [
-            tx.__dict__ for tx in dict_block['transactions']]
+        dict_block = block.to_dict()
         response = {
             'message': 'Block added successfully.',
             'block': dict_block,
@@ -214,18 +270,137 @@ def resolve_conflicts():
 @app.route('/transactions', methods=['GET'])
 def get_open_transaction():
     transactions = blockchain.get_open_transactions()
-    dict_transactions = [tx.__dict__ for tx in transactions]
+    dict_transactions = [tx.to_dict() for tx in transactions]
     return jsonify(dict_transactions), 200
 
 
 @app.route('/chain', methods=['GET'])
 def get_chain():
-    chain_snapshot = blockchain.chain
-    dict_chain = [block.__dict__.copy() for block in chain_snapshot]
-    for dict_block in dict_chain:
-        dict_block['transactions'] = [
-            tx.__dict__ for tx in dict_block['transactions']]
-    return jsonify(dict_chain), 200
+    page = get_page_args()
+    if page is None:
+        response = {'message': 'Invalid offset or limit.'}
+        return jsonify(response), 400
+    (offset, limit) = page
+    stream = BOOLEAN_VALUES.get(request.args.get('stream', '').lower())
+    if stream is None:
+        response = {'message': 'Invalid stream.'}
+        return jsonify(response), 400
+    stop = offset + limit if limit is not None else None
+    if stream:
+        # Newline delimited JSON, one block per line
+        def generate():
+            for block in blockchain.iter_blocks(offset, stop):
+                yield json.dumps(block.to_dict()) + '\n'
+        return Response(stream_with_context(generate()),
+                        mimetype='application/x-ndjson')
+    if 'offset' in request.args or limit is not None:
+        response = {
+            'blocks': [block.to_dict()
+                       for block in blockchain.iter_blocks(offset, stop)],
+            'offset': offset,
+            'length': blockchain.get_chain_length()
+        }
+        return jsonify(response), 200
+    compressed = request.accept_encodings['gzip'] > 0
+    etag = ChainCache.etag(blockchain, compressed)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        return response
+    etag, body = chain_cache.get(blockchain, compressed)
+    response = Response(body, status=200, mimetype='application/json')
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    if compressed:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+@app.route('/chain/tip', methods=['GET'])
+def get_chain_tip():
+    last_block = blockchain.get_last_blockchain_value()
+    response = {
+        'length': blockchain.get_chain_length(),
+        'index': last_block.index,
+        'hash': last_block.hash
+    }
+    return jsonify(response), 200
+
+
+@app.route('/headers/from/<int:index>', methods=['GET'])
+def get_headers_from(index):
+    headers = [block.header() for block in blockchain.iter_blocks(index)]
+    return jsonify(headers), 200
+
+
+@app.route('/block/<int:index>', methods=['GET'])
+def get_block(index):
+    block = blockchain.get_block(index)
+    if block is None:
+        response = {'message': 'Block not found.'}
+        return jsonify(response), 404
+    return jsonify(block.to_dict()), 200
+
+
+@app.route('/block/hash/<block_hash>', methods=['GET'])
+def get_block_by_hash(block_hash):
+    block = blockchain.get_block_by_hash(block_hash)
+    if block is None:
+        response = {'message': 'Block not found.'}
+        return jsonify(response), 404
+    return jsonify(block.to_dict()), 200
+
+
+@app.route('/transaction/<transaction_id>', methods=['GET'])
+def get_transaction(transaction_id):
+    result = blockchain.get_transaction(transaction_id)
+    if result is None:
+        response = {'message': 'Transaction not found.'}
+        return jsonify(response), 404
+    (transaction, locations, open_count) = result
+    length = blockchain.get_chain_length()
+    response = {
+        'transaction': transaction.to_dict(),
+        # Transactions with the same ID (e.g. repeated payments) are all
+        # listed, in the order of the chain
+        'locations': [
+            {
+                'block_index': height,
+                'position': position,
+                'confirmations': length - height
+            }
+            for (height, position) in locations
+        ],
+        'open': open_count
+    }
+    return jsonify(response), 200
+
+
+@app.route('/address/<key>/transactions', methods=['GET'])
+def get_address_transactions(key):
+    page = get_page_args()
+    if page is None:
+        response = {'message': 'Invalid offset or limit.'}
+        return jsonify(response), 400
+    (offset, limit) = page
+    length = blockchain.get_chain_length()
+    transactions = [
+        {
+            'transaction': transaction.to_dict(),
+            'block_index': height,
+            'position': position,
+            'confirmations': length - height
+        }
+        for (transaction, height, position)
+        in blockchain.get_address_transactions(key, offset, limit)
+    ]
+    response = {
+        'transactions': transactions,
+        'offset': offset,
+        'length': blockchain.get_address_transaction_count(key)
+    }
+    return jsonify(response), 200
 
 
 @app.route('/node', methods=['POST'])
@@ -274,12 +449,62 @@ def get_nodes():
     return jsonify(response), 200
 
 
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    response = {
+        'verifier_cache': Wallet.get_verifier_cache_info(),
+        'peers': blockchain.get_peer_stats(),
+        'broadcast_queue': (broadcast_queue.get_stats()
+                            if broadcast_queue is not None else None)
+    }
+    return jsonify(response), 200
+
+
 if __name__ == '__main__':
     from argparse import ArgumentParser
     parser = ArgumentParser()
     parser.add_argument('-p', '--port', type=int, default=5000)
+    parser.add_argument('-s', '--storage',
+                        choices=['snapshot', 'log', 'binary', 'mmap'],
+                        default='snapshot',
+                        help='mmap decodes blocks lazily (the balances '
+                             'and indexes are loaded from their files, but '
+                             'stay in memory)')
+    parser.add_argument('-m', '--mining-processes', type=int, default=1)
+    parser.add_argument('--mining-mode', choices=['lowest', 'first'],
+                        default='lowest')
+    parser.add_argument('--verify-processes', type=int, default=1)
+    parser.add_argument('--peer-timeout', type=float, default=PEER_TIMEOUT)
+    parser.add_argument('--async-broadcast', action='store_true')
     args = parser.parse_args()
     port = args.port
+    peer_client = PeerClient(timeout=args.peer_timeout)
+    broadcast_queue = None
+    if args.async_broadcast:
+        broadcast_queue = BroadcastQueue(peer_client)
+    blockchain_options = {
+        'storage': args.storage,
+        'mining_processes': args.mining_processes,
+        'mining_mode': args.mining_mode,
+        'verify_processes': args.verify_processes,
+        # Shared by all blockchains so that connections and statistics are
+        # kept when the wallet changes
+        'peer_client': peer_client,
+        'broadcast_queue': broadcast_queue
+    }
     wallet = Wallet(port)
-    blockchain = Blockchain(wallet.public_key, port)
-    app.run(host='0.0.0.0', port=port)
+    blockchain = Blockchain(wallet.public_key, port, **blockchain_options)
+
+    def stop(signum, frame):
+        # SIGTERM would end the process without running the finally block
+        # below, the queued broadcasts are shipped first
+        if broadcast_queue is not None:
+            broadcast_queue.close()
+        raise SystemExit(0)
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        app.run(host='0.0.0.0', port=port)
+    finally:
+        # Ship the queued broadcasts while the PeerClient still accepts work
+        if broadcast_queue is not None:
+            broadcast_queue.close()
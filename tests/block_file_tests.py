@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+
+from tests.chains import extend_chain
+
+
+class CountingChain(list):
+    """A chain which counts how many of its blocks were accessed."""
+
+    accessed = 0
+
+    def __getitem__(self, index):
+        self.accessed += 1
+        return super().__getitem__(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class BlockFileTests:
+    """The tests every block file has to pass (mixed into a TestCase).
+
+    Subclasses implement open (which returns a new block file for a path)
+    and assertLoaded (which checks the data of a block file against a
+    chain).
+
+    Attributes:
+        :extension: The extension of the file.
+    """
+    extension = ''
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'blockchain' + self.extension)
+        self.chain = extend_chain([], 6, 'a')
+        # A fork which has the first three blocks in common with the chain
+        self.fork = extend_chain(self.chain[:3], 8, 'b')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def open(self, path):
+        raise NotImplementedError
+
+    def assertLoaded(self, block_file, chain):
+        raise NotImplementedError
+
+    def rebuild(self, chain, path=None):
+        block_file = self.open(path or self.path)
+        block_file.rebuild(chain)
+        return block_file
+
+    def assertSameFile(self, chain):
+        """Check that the file holds the same entries as a new file for a
+        chain."""
+        fresh_path = os.path.join(self.directory, 'fresh' + self.extension)
+        self.rebuild(chain, fresh_path)
+        with open(self.path, mode='rb') as f, \
+                open(fresh_path, mode='rb') as fresh:
+            self.assertEqual(f.read(), fresh.read())
+
+    def test_rebuild(self):
+        self.assertLoaded(self.rebuild(self.chain), self.chain)
+        self.assertSameFile(self.chain)
+
+    def test_add_is_stored(self):
+        block_file = self.rebuild(self.chain[:4])
+        block_file.add(self.chain[4])
+        block_file.add(self.chain[5])
+        self.assertLoaded(block_file, self.chain)
+        self.assertLoaded(self.rebuild(self.chain), self.chain)
+        self.assertSameFile(self.chain)
+
+    def test_rebuild_from_file(self):
+        chain = extend_chain([], 64)
+        self.rebuild(chain)
+        # Only the blocks needed to find the fork point (by bisection) are
+        # accessed, the data of all other blocks is loaded from the file
+        counting = CountingChain(chain)
+        block_file = self.rebuild(counting)
+        self.assertLessEqual(counting.accessed, 7)
+        self.assertLoaded(block_file, chain)
+
+    def test_rebuild_after_fork(self):
+        self.rebuild(self.chain)
+        self.assertLoaded(self.rebuild(self.fork), self.fork)
+        # The entries of the old fork were removed from the file
+        self.assertLoaded(self.rebuild(self.fork), self.fork)
+        self.assertSameFile(self.fork)
+
+    def test_torn_tail(self):
+        self.rebuild(self.chain[:4])
+        with open(self.path, mode='ab') as f:
+            f.write(b'\x00' * 5)
+        self.assertLoaded(self.rebuild(self.chain), self.chain)
+        self.assertSameFile(self.chain)
+
+    def test_older_format(self):
+        # A file without the magic bytes is derived from the blocks again
+        with open(self.path, mode='wb') as f:
+            f.write(b'\x00' * 100)
+        self.assertLoaded(self.rebuild(self.chain), self.chain)
+        self.assertSameFile(self.chain)
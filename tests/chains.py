@@ -0,0 +1,18 @@
+from block import Block
+from transaction import Transaction
+
+
+def extend_chain(chain, length, branch=''):
+    """Return a copy of a chain with blocks appended until it has the given
+    length. The blocks of different branches differ in their transactions
+    (no proof or signatures are needed by the indexes)."""
+    chain = list(chain)
+    while len(chain) < length:
+        index = len(chain)
+        previous_hash = chain[-1].hash if chain else ''
+        transactions = [
+            Transaction('alice', 'bob' + branch, '', index),
+            Transaction('MINING', 'alice', '', 10)
+        ]
+        chain.append(Block(index, previous_hash, transactions, 0, index))
+    return chain
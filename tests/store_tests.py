@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+
+from block import Block
+from transaction import Transaction
+from utility.hash_util import hash_block
+from wallet import Wallet
+
+
+class StoreTests:
+    """The tests every store has to pass (mixed into a TestCase).
+
+    Attributes:
+        :store_class: The class of the tested store.
+        :extension: The extension of the path the store is created with.
+        :appended: The extension of the file new blocks are appended to.
+    """
+    store_class = None
+    extension = ''
+    appended = ''
+
+    @classmethod
+    def setUpClass(cls):
+        cls.sender = Wallet(1)
+        cls.sender.create_keys()
+        cls.recipient = Wallet(2)
+        cls.recipient.create_keys()
+        cls.chain = []
+        for index in range(5):
+            cls.chain.append(cls.make_block(index))
+        cls.open_transactions = [cls.make_transaction(1.5)]
+        cls.peer_nodes = {'localhost:5001', 'localhost:5002'}
+
+    @classmethod
+    def make_transaction(cls, amount):
+        signature = cls.sender.sign_transaction(cls.sender.public_key,
+                                                cls.recipient.public_key,
+                                                amount)
+        return Transaction(cls.sender.public_key, cls.recipient.public_key,
+                           signature, amount)
+
+    @classmethod
+    def make_block(cls, index):
+        previous_hash = hash_block(cls.chain[-1]) if cls.chain else ''
+        transactions = [Transaction('MINING', cls.sender.public_key, '', 10)]
+        if index > 0:
+            transactions.append(cls.make_transaction(index / 2))
+        return Block(index, previous_hash, transactions, 100 + index, index)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def open(self):
+        return self.store_class(
+            os.path.join(self.directory, 'blockchain' + self.extension))
+
+    def append_block(self, store, chain, block):
+        """Append a block like the Blockchain does (the chain of a memory
+        mapped store writes the block itself)."""
+        chain.append(block)
+        store.append_block(block)
+
+    def assertSameChain(self, chain, expected):
+        self.assertEqual([block.hash for block in chain],
+                         [block.hash for block in expected])
+
+    def test_load_without_files(self):
+        self.assertIsNone(self.open().load())
+
+    def test_snapshot_round_trip(self):
+        self.open().snapshot(self.chain, self.open_transactions,
+                             self.peer_nodes)
+        (chain, open_transactions, peer_nodes) = self.open().load()
+        self.assertSameChain(chain, self.chain)
+        # The loaded chain is written back (it may still read from the files
+        # it replaces) and loaded again
+        store = self.open()
+        (chain, open_transactions, peer_nodes) = store.load()
+        store.snapshot(chain, open_transactions, peer_nodes)
+        (chain, open_transactions, peer_nodes) = self.open().load()
+        self.assertSameChain(chain, self.chain)
+        self.assertEqual([tx.id for tx in open_transactions],
+                         [tx.id for tx in self.open_transactions])
+        self.assertEqual(set(peer_nodes), self.peer_nodes)
+
+    def test_append_after_snapshot(self):
+        store = self.open()
+        chain = store.snapshot(self.chain[:3], [], set())
+        self.append_block(store, chain, self.chain[3])
+        self.append_block(store, chain, self.chain[4])
+        store.append_transaction(self.open_transactions[0])
+        store.append_peer('localhost:5001')
+        store.append_peer('localhost:5003')
+        store.append_peer('localhost:5003', removed=True)
+        (chain, open_transactions, peer_nodes) = self.open().load()
+        self.assertSameChain(chain, self.chain)
+        self.assertEqual([tx.id for tx in open_transactions],
+                         [tx.id for tx in self.open_transactions])
+        self.assertEqual(set(peer_nodes), {'localhost:5001'})
+
+    def test_repeated_open_transactions(self):
+        # Repeated payments have the same ID, a block confirms only one
+        store = self.open()
+        chain = store.snapshot(self.chain[:4], [], set())
+        repeated = self.chain[4].transactions[1]
+        store.append_transaction(repeated)
+        store.append_transaction(repeated)
+        self.append_block(store, chain, self.chain[4])
+        (_, open_transactions, _) = self.open().load()
+        self.assertEqual([tx.id for tx in open_transactions], [repeated.id])
+
+    def test_torn_tail(self):
+        store = self.open()
+        store.snapshot(self.chain[:4], [], set())
+        # A write which was interrupted by a crash
+        path = os.path.join(self.directory, 'blockchain' + self.appended)
+        with open(path, mode='ab') as f:
+            f.write(b'{"o')
+        store = self.open()
+        (chain, _, _) = store.load()
+        self.assertSameChain(chain, self.chain[:4])
+        self.append_block(store, chain, self.chain[4])
+        (chain, _, _) = self.open().load()
+        self.assertSameChain(chain, self.chain)
@@ -0,0 +1,51 @@
+import unittest
+
+from block import Block
+from tests.chains import extend_chain
+from transaction import Transaction
+from utility.address_index import AddressIndex
+
+
+class AddressIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.chain = extend_chain([], 4)
+        # A block with a payment to the sender itself
+        self.chain.append(Block(4, self.chain[-1].hash,
+                                [Transaction('alice', 'alice', '', 5)], 0, 4))
+        self.index = AddressIndex()
+        self.index.rebuild(self.chain)
+        # Alice pays bob and is rewarded in every block
+        self.alice = ([(height, position) for height in range(4)
+                       for position in range(2)] + [(4, 0)])
+
+    def test_get_locations(self):
+        self.assertEqual(self.index.get_locations('alice'), self.alice)
+        self.assertEqual(self.index.get_locations('bob'),
+                         [(height, 0) for height in range(4)])
+        self.assertEqual(self.index.get_locations('MINING'),
+                         [(height, 1) for height in range(4)])
+
+    def test_sender_and_recipient(self):
+        # A transaction is listed once even if the address sent and received
+        # it
+        self.assertEqual(self.index.count('alice'), 9)
+        self.assertEqual(self.index.get_locations('alice', 8), [(4, 0)])
+
+    def test_pages(self):
+        for offset in (0, 1, 8, 9, 100):
+            for limit in (None, 0, 1, 3, 100):
+                with self.subTest(offset=offset, limit=limit):
+                    stop = None if limit is None else offset + limit
+                    self.assertEqual(
+                        self.index.get_locations('alice', offset, limit),
+                        self.alice[offset:stop])
+
+    def test_unknown_address(self):
+        self.assertEqual(self.index.count('nobody'), 0)
+        self.assertEqual(self.index.get_locations('nobody'), [])
+        self.assertEqual(self.index.get_locations('nobody', 5, 0), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
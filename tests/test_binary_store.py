@@ -0,0 +1,14 @@
+import unittest
+
+from tests.store_tests import StoreTests
+from utility.binary_store import BinaryStore
+
+
+class BinaryStoreTest(StoreTests, unittest.TestCase):
+    store_class = BinaryStore
+    extension = '.bin'
+    appended = '.bin'
+
+
+if __name__ == '__main__':
+    unittest.main()
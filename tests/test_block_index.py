@@ -0,0 +1,27 @@
+import unittest
+
+from tests.block_file_tests import BlockFileTests
+from utility.block_index import BlockIndex
+
+
+class BlockIndexTest(BlockFileTests, unittest.TestCase):
+    extension = '.hashes'
+
+    def open(self, path):
+        return BlockIndex(path)
+
+    def assertLoaded(self, index, chain):
+        self.assertEqual(len(index), len(chain))
+        for block in chain:
+            self.assertEqual(index.get_height(block.hash), block.index)
+
+    def test_unknown_hash(self):
+        index = self.rebuild(self.chain)
+        self.assertIsNone(index.get_height('00' * 32))
+        self.assertIsNone(index.get_height('not a hash'))
+        for block in self.fork[3:]:
+            self.assertIsNone(index.get_height(block.hash))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,14 @@
+import unittest
+
+from tests.store_tests import StoreTests
+from utility.block_log import BlockLog
+
+
+class BlockLogTest(StoreTests, unittest.TestCase):
+    store_class = BlockLog
+    extension = '.log'
+    appended = '.log'
+
+
+if __name__ == '__main__':
+    unittest.main()
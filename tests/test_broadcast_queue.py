@@ -0,0 +1,108 @@
+import threading
+import time
+import unittest
+
+from utility.broadcast_queue import BroadcastQueue
+from utility.peer_client import PeerClient
+
+
+class RecordingPeerClient(PeerClient):
+    """Records the posted payloads instead of sending them. Posting blocks
+    until release is set.
+
+    Attributes:
+        :posted: The posted payloads.
+        :release: Set to let the posts return.
+        :started: Set once the first post started.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.posted = []
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def post(self, node, path, payload):
+        self.started.set()
+        self.release.wait(5)
+        self.posted.append(payload)
+        return 'response'
+
+
+class BroadcastQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.peer_client = RecordingPeerClient()
+        self.queue = BroadcastQueue(self.peer_client, max_size=2)
+
+    def tearDown(self):
+        self.peer_client.release.set()
+        self.queue.close()
+
+    def block_worker(self):
+        """Queue a broadcast which the worker is stuck shipping."""
+        self.assertTrue(self.queue.put(['node'], '/path', 0))
+        self.assertTrue(self.peer_client.started.wait(5))
+
+    def test_ship(self):
+        responses = []
+        self.peer_client.release.set()
+        self.queue.put(['node-1', 'node-2'], '/path', 1, responses.append)
+        self.queue.close()
+        self.assertEqual(self.peer_client.posted, [1, 1])
+        self.assertEqual(responses, [{'node-1': 'response',
+                                      'node-2': 'response'}])
+        stats = self.queue.get_stats()
+        self.assertEqual((stats['enqueued'], stats['shipped'],
+                          stats['failed'], stats['depth']), (1, 1, 0, 0))
+
+    def test_drop_when_full(self):
+        self.block_worker()
+        self.assertTrue(self.queue.put(['node'], '/path', 1))
+        self.assertTrue(self.queue.put(['node'], '/path', 2))
+        self.assertFalse(self.queue.put(['node'], '/path', 3))
+        stats = self.queue.get_stats()
+        self.assertEqual((stats['enqueued'], stats['dropped'],
+                          stats['high_watermark'], stats['depth']),
+                         (3, 1, 2, 2))
+
+    def test_close_drains(self):
+        self.block_worker()
+        self.queue.put(['node'], '/path', 1)
+        self.queue.put(['node'], '/path', 2)
+        self.peer_client.release.set()
+        self.queue.close()
+        self.assertEqual(sorted(self.peer_client.posted), [0, 1, 2])
+        self.assertEqual(self.queue.get_stats()['shipped'], 3)
+        self.assertFalse(self.queue.put(['node'], '/path', 3))
+
+    def test_close_without_drain(self):
+        self.block_worker()
+        self.queue.put(['node'], '/path', 1)
+        self.queue.put(['node'], '/path', 2)
+        # The worker finishes its batch once the queue was emptied
+        timer = threading.Timer(0.2, self.peer_client.release.set)
+        timer.start()
+        self.queue.close(drain=False)
+        timer.join()
+        self.assertEqual(self.peer_client.posted, [0])
+        self.assertEqual(self.queue.get_stats()['shipped'], 1)
+
+    def test_failed_batch_keeps_worker(self):
+        post = self.peer_client.post
+
+        def fail_first(node, path, payload):
+            if payload == 1:
+                raise RuntimeError('peer client shut down')
+            return post(node, path, payload)
+        self.peer_client.release.set()
+        self.peer_client.post = fail_first
+        self.queue.put(['node'], '/path', 1)
+        deadline = time.time() + 5
+        while self.queue.get_stats()['failed'] == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        # The worker still ships the next batch
+        self.queue.put(['node'], '/path', 2)
+        self.queue.close()
+        self.assertEqual(self.peer_client.posted, [2])
+        self.assertEqual(self.queue.get_stats()['failed'], 1)
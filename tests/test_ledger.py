@@ -0,0 +1,89 @@
+import random
+import unittest
+
+from block import Block
+from ledger import Ledger
+from transaction import Transaction
+
+PARTICIPANTS = ['alice', 'bob', 'carol', 'dave']
+
+
+def make_chain(length, seed=1):
+    """Create a chain of random transfers (the ledger doesn't verify
+    blocks, so no proof or signatures are needed)."""
+    generator = random.Random(seed)
+    chain = []
+    for index in range(length):
+        transactions = [Transaction('MINING', generator.choice(PARTICIPANTS),
+                                    '', 10)]
+        for _ in range(generator.randrange(3)):
+            (sender, recipient) = generator.sample(PARTICIPANTS, 2)
+            transactions.append(Transaction(sender, recipient, '',
+                                            generator.randrange(1, 50) / 4))
+        chain.append(Block(index, '', transactions, 0, index))
+    return chain
+
+
+class LedgerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.chain = make_chain(250)
+
+    def replay(self, participant, height):
+        """Calculate a balance the slow way, by replaying the chain."""
+        balance = 0
+        for block in self.chain[:height + 1]:
+            for tx in block.transactions:
+                if tx.sender == participant:
+                    balance -= tx.amount
+                if tx.recipient == participant:
+                    balance += tx.amount
+        return balance
+
+    def test_get_balance_at_matches_replay(self):
+        # 5000 is longer than the chain (so there is no checkpoint at all)
+        for interval in (1, 7, 100, 1000, 5000):
+            ledger = Ledger(interval)
+            ledger.rebuild(self.chain)
+            for participant in PARTICIPANTS + ['MINING']:
+                for height in range(len(self.chain)):
+                    with self.subTest(interval=interval,
+                                      participant=participant,
+                                      height=height):
+                        self.assertAlmostEqual(
+                            ledger.get_balance_at(participant, height,
+                                                  self.chain),
+                            self.replay(participant, height))
+
+    def test_inactive_participant(self):
+        # Erin's amounts only change in two blocks, so the checkpoints after
+        # them don't record her
+        for (index, tx) in ((3, Transaction('MINING', 'erin', '', 7)),
+                            (120, Transaction('erin', 'alice', '', 2.5))):
+            transactions = list(self.chain[index].transactions) + [tx]
+            self.chain[index] = Block(index, '', transactions, 0, index)
+        for interval in (1, 7, 100):
+            ledger = Ledger(interval)
+            ledger.rebuild(self.chain)
+            for height in range(len(self.chain)):
+                with self.subTest(interval=interval, height=height):
+                    self.assertAlmostEqual(
+                        ledger.get_balance_at('erin', height, self.chain),
+                        self.replay('erin', height))
+
+    def test_get_balance_matches_replay(self):
+        ledger = Ledger()
+        ledger.rebuild(self.chain)
+        for participant in PARTICIPANTS + ['MINING']:
+            self.assertAlmostEqual(
+                ledger.get_balance(participant),
+                self.replay(participant, len(self.chain) - 1))
+
+    def test_unknown_participant(self):
+        ledger = Ledger()
+        ledger.rebuild(self.chain)
+        self.assertEqual(ledger.get_balance_at('nobody', 10, self.chain), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+from ledger import Ledger
+from tests.block_file_tests import BlockFileTests
+from tests.chains import extend_chain
+from utility.address_index import AddressIndex
+from utility.ledger_file import LedgerFile
+
+PARTICIPANTS = ['alice', 'boba', 'bobb', 'MINING', 'nobody']
+
+
+class LedgerFileTest(BlockFileTests, unittest.TestCase):
+    extension = '.ledger'
+
+    def open(self, path):
+        return LedgerFile(path, Ledger(checkpoint_interval=2), AddressIndex())
+
+    def assertLoaded(self, ledger_file, chain):
+        ledger = Ledger(checkpoint_interval=2)
+        ledger.rebuild(chain)
+        address_index = AddressIndex()
+        address_index.rebuild(chain)
+        for participant in PARTICIPANTS:
+            self.assertEqual(ledger_file.ledger.get_balance(participant),
+                             ledger.get_balance(participant))
+            for height in range(len(chain)):
+                self.assertEqual(
+                    ledger_file.ledger.get_balance_at(participant, height,
+                                                      chain),
+                    ledger.get_balance_at(participant, height, chain))
+            self.assertEqual(
+                ledger_file.address_index.get_locations(participant),
+                address_index.get_locations(participant))
+
+    def test_fractional_amounts(self):
+        chain = extend_chain([], 3)
+        chain[2].transactions[0].amount = 2.5
+        self.rebuild(chain)
+        # Loaded from the file
+        ledger_file = self.rebuild(chain)
+        self.assertEqual(ledger_file.ledger.get_balance('alice'), 26.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from transaction import Transaction
+from utility.mining import MiningEngine
+from utility.verification import Verification
+
+TRANSACTIONS = [Transaction('alice', 'bob', 'signature', 2.5),
+                Transaction('bob', 'carol', 'signature', 1)]
+
+
+def lowest_proof(transactions, last_hash):
+    """Find the lowest proof the slow way, with Verification.valid_proof."""
+    proof = 0
+    while not Verification.valid_proof(transactions, last_hash, proof):
+        proof += 1
+    return proof
+
+
+class MiningEngineTest(unittest.TestCase):
+
+    def test_search_matches_valid_proof(self):
+        for last_hash in ('', 'a' * 64, 'b' * 64, 'c' * 64):
+            with self.subTest(last_hash=last_hash):
+                engine = MiningEngine.for_block(TRANSACTIONS, last_hash)
+                self.assertEqual(engine.search(),
+                                 lowest_proof(TRANSACTIONS, last_hash))
+
+    def test_check_matches_valid_proof(self):
+        engine = MiningEngine.for_block(TRANSACTIONS, 'a' * 64)
+        for proof in range(2000):
+            self.assertEqual(engine.check(proof),
+                             Verification.valid_proof(TRANSACTIONS, 'a' * 64,
+                                                      proof))
+
+    def test_parallel_search_matches_search(self):
+        for last_hash in ('', 'a' * 64, 'b' * 64):
+            with self.subTest(last_hash=last_hash):
+                engine = MiningEngine.for_block(TRANSACTIONS, last_hash)
+                self.assertEqual(engine.parallel_search(3), engine.search())
+
+    def test_parallel_search_first(self):
+        engine = MiningEngine.for_block(TRANSACTIONS, 'a' * 64)
+        proof = engine.parallel_search(3, lowest=False)
+        self.assertTrue(Verification.valid_proof(TRANSACTIONS, 'a' * 64,
+                                                 proof))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from block import Block
+from blockchain import Blockchain
+from tests.chains import extend_chain
+from tests.store_tests import StoreTests
+from transaction import Transaction
+from utility import mmap_store
+from utility.mmap_store import MmapStore
+
+
+class MmapStoreTest(StoreTests, unittest.TestCase):
+    store_class = MmapStore
+    extension = ''
+    appended = '.idx'
+
+    def test_torn_address_tail(self):
+        store = self.open()
+        store.snapshot(self.chain[:4], [], set())
+        with open(os.path.join(self.directory, 'blockchain.addr'),
+                  mode='ab') as f:
+            f.write(b'A\x40\x00')
+        store = self.open()
+        (chain, _, _) = store.load()
+        # The new block uses an address which isn't in the file yet
+        block = Block(4, self.chain[4].previous_hash,
+                      [Transaction('MINING', 'new-address', '', 10)], 0, 4)
+        self.append_block(store, chain, block)
+        (chain, _, _) = self.open().load()
+        self.assertSameChain(chain, self.chain[:4] + [block])
+        self.assertEqual(chain[4].transactions[0].recipient, 'new-address')
+
+    def test_pickle_lazy_chain(self):
+        chain = self.open().snapshot(self.chain, [], set())
+        self.assertSameChain(pickle.loads(pickle.dumps(chain[:3])),
+                             self.chain[:3])
+
+    def test_truncate(self):
+        store = self.open()
+        chain = store.snapshot(self.chain[:4], [], set())
+        blocks_path = os.path.join(self.directory, 'blockchain.blocks')
+        size = os.path.getsize(blocks_path)
+        # The cached blocks of the old fork are dropped as well
+        self.assertSameChain(chain, self.chain[:4])
+        # Another fork continues after the second block
+        block = Block(2, self.chain[2].previous_hash,
+                      [Transaction('MINING', 'fork', '', 10)], 0, 2)
+        chain = store.truncate(2, self.open_transactions, {'localhost:5001'})
+        self.assertSameChain(chain, self.chain[:2])
+        self.assertLess(os.path.getsize(blocks_path), size)
+        chain.append(block)
+        self.assertSameChain(chain, self.chain[:2] + [block])
+        (chain, open_transactions, peer_nodes) = self.open().load()
+        self.assertSameChain(chain, self.chain[:2] + [block])
+        self.assertEqual([tx.id for tx in open_transactions],
+                         [tx.id for tx in self.open_transactions])
+        self.assertEqual(peer_nodes, {'localhost:5001'})
+
+
+class MmapBlockchainTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.mkdtemp()
+        # The blockchain keeps its files in the working directory
+        os.chdir(self.directory)
+        self.chain = extend_chain([], 64)
+        MmapStore('blockchain-5000').snapshot(self.chain, [], set())
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def test_startup_loads_ledger_and_indexes(self):
+        # The first start derives the ledger and the indexes from the blocks
+        Blockchain('alice', 5000, storage='mmap')
+        with mock.patch('utility.mmap_store.unpack_block',
+                        wraps=mmap_store.unpack_block) as unpack_block:
+            blockchain = Blockchain('alice', 5000, storage='mmap')
+        # Only the blocks needed to find the fork point of the files are
+        # decoded
+        self.assertLessEqual(unpack_block.call_count, 7)
+        self.assertEqual(blockchain.get_balance(),
+                         10 * 64 - sum(range(64)))
+        self.assertEqual(blockchain.get_address_transaction_count('bob'), 64)
+        last = self.chain[-1]
+        self.assertEqual(blockchain.get_block_by_hash(last.hash).index, 63)
+
+
+if __name__ == '__main__':
+    unittest.main()
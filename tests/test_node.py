@@ -0,0 +1,246 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import node
+from blockchain import Blockchain
+from utility.chain_cache import ChainCache
+from wallet import Wallet
+
+
+class AppendingBlockchain:
+    """Mines a block after the tip of a blockchain was read (while its chain
+    is serialized)."""
+
+    def __init__(self, blockchain):
+        self.blockchain = blockchain
+        self.tip = blockchain.get_last_blockchain_value()
+
+    def get_last_blockchain_value(self):
+        return self.tip
+
+    def iter_blocks(self, start=0, stop=None):
+        self.blockchain.mine_block()
+        return self.blockchain.iter_blocks(start, stop)
+
+
+class NodeTestCase(unittest.TestCase):
+    """Serves a blockchain (with one mined block) with the app of
+    node.py."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.wallet = Wallet(5000)
+        cls.wallet.create_keys()
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.mkdtemp()
+        # The blockchain keeps its files in the working directory
+        os.chdir(self.directory)
+        self.blockchain = Blockchain(self.wallet.public_key, 5000)
+        self.blockchain.mine_block()
+        node.blockchain = self.blockchain
+        node.chain_cache = ChainCache()
+        self.client = node.app.test_client()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+
+class ChainEndpointTest(NodeTestCase):
+
+    def test_chain(self):
+        response = self.client.get('/chain')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(),
+                         [block.to_dict() for block in self.blockchain.chain])
+        self.assertIsNotNone(response.get_etag()[0])
+
+    def test_not_modified(self):
+        etag = self.client.get('/chain').get_etag()[0]
+        response = self.client.get('/chain',
+                                   headers={'If-None-Match': '"{}"'.format(
+                                       etag)})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.get_etag()[0], etag)
+
+    def test_etag_changes_with_tip(self):
+        etag = self.client.get('/chain').get_etag()[0]
+        self.blockchain.mine_block()
+        response = self.client.get('/chain',
+                                   headers={'If-None-Match': '"{}"'.format(
+                                       etag)})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.get_etag()[0], etag)
+        self.assertEqual(len(response.get_json()), 3)
+
+    def test_gzip(self):
+        response = self.client.get('/chain',
+                                   headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.data)),
+                         [block.to_dict() for block in self.blockchain.chain])
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+    def test_gzip_etag(self):
+        etag = self.client.get('/chain').get_etag()[0]
+        response = self.client.get('/chain',
+                                   headers={'Accept-Encoding': 'gzip',
+                                            'If-None-Match': '"{}"'.format(
+                                                etag)})
+        # The compressed body is another representation with its own ETag
+        self.assertEqual(response.status_code, 200)
+        gzip_etag = response.get_etag()[0]
+        self.assertNotEqual(gzip_etag, etag)
+        response = self.client.get('/chain',
+                                   headers={'Accept-Encoding': 'gzip',
+                                            'If-None-Match': '"{}"'.format(
+                                                gzip_etag)})
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_matches_body(self):
+        blockchain = AppendingBlockchain(self.blockchain)
+        (etag, body) = ChainCache().get(blockchain)
+        self.assertEqual(etag, '2-{}'.format(blockchain.tip.hash))
+        self.assertEqual(len(json.loads(body)), 2)
+
+    def test_page(self):
+        self.blockchain.mine_block()
+        response = self.client.get('/chain?offset=1&limit=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {
+            'blocks': [self.blockchain.chain[1].to_dict()],
+            'offset': 1,
+            'length': 3
+        })
+
+    def test_invalid_page(self):
+        for query in ('offset=-1', 'limit=-1', 'limit=abc', 'offset=1.5',
+                      'stream=maybe'):
+            with self.subTest(query=query):
+                response = self.client.get('/chain?' + query)
+                self.assertEqual(response.status_code, 400)
+
+    def test_stream(self):
+        response = self.client.get('/chain?stream=true')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual(
+            [json.loads(line) for line in response.data.splitlines()],
+            [block.to_dict() for block in self.blockchain.chain])
+        for value in ('0', 'false', 'no'):
+            with self.subTest(stream=value):
+                response = self.client.get('/chain?stream=' + value)
+                self.assertEqual(response.mimetype, 'application/json')
+
+
+class TransactionEndpointTest(NodeTestCase):
+
+    def pay(self):
+        signature = self.wallet.sign_transaction(self.wallet.public_key,
+                                                 'bob', 1)
+        self.assertTrue(self.blockchain.add_transaction(
+            'bob', self.wallet.public_key, signature, 1))
+        return self.blockchain.get_open_transactions()[-1]
+
+    def test_unknown_transaction(self):
+        response = self.client.get('/transaction/' + '00' * 32)
+        self.assertEqual(response.status_code, 404)
+
+    def test_open_transaction(self):
+        transaction = self.pay()
+        response = self.client.get('/transaction/' + transaction.id)
+        self.assertEqual(response.get_json(), {
+            'transaction': transaction.to_dict(),
+            'locations': [],
+            'open': 1
+        })
+
+    def test_repeated_ids(self):
+        # The rewards of the same miner and repeated payments have the same
+        # ID, every one of them is located
+        self.blockchain.mine_block()
+        reward = self.blockchain.chain[1].transactions[0]
+        response = self.client.get('/transaction/' + reward.id)
+        self.assertEqual(response.get_json()['locations'], [
+            {'block_index': 1, 'position': 0, 'confirmations': 2},
+            {'block_index': 2, 'position': 0, 'confirmations': 1}
+        ])
+        transaction = self.pay()
+        self.pay()
+        self.blockchain.mine_block()
+        self.pay()
+        response = self.client.get('/transaction/' + transaction.id)
+        self.assertEqual(response.get_json(), {
+            'transaction': transaction.to_dict(),
+            'locations': [
+                {'block_index': 3, 'position': 0, 'confirmations': 1},
+                {'block_index': 3, 'position': 1, 'confirmations': 1}
+            ],
+            'open': 1
+        })
+
+
+class AddressEndpointTest(NodeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        key = self.wallet.public_key
+        # A payment to bob and one to the miner itself
+        for recipient in ('bob', key):
+            signature = self.wallet.sign_transaction(key, recipient, 1)
+            self.assertTrue(self.blockchain.add_transaction(
+                recipient, key, signature, 1))
+        self.blockchain.mine_block()
+        self.path = '/address/{}/transactions'.format(key)
+
+    def get_locations(self, query=''):
+        response = self.client.get(self.path + query)
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['length'], 4)
+        return [(tx['block_index'], tx['position'])
+                for tx in data['transactions']]
+
+    def test_transactions(self):
+        # The payment to itself is listed once
+        self.assertEqual(self.get_locations(),
+                         [(1, 0), (2, 0), (2, 1), (2, 2)])
+        response = self.client.get(self.path)
+        self.assertEqual(response.get_json()['transactions'][0], {
+            'transaction': self.blockchain.chain[1].transactions[0].to_dict(),
+            'block_index': 1,
+            'position': 0,
+            'confirmations': 2
+        })
+
+    def test_page(self):
+        self.assertEqual(self.get_locations('?offset=1&limit=2'),
+                         [(2, 0), (2, 1)])
+        self.assertEqual(self.get_locations('?offset=3&limit=5'), [(2, 2)])
+
+    def test_page_edges(self):
+        self.assertEqual(self.get_locations('?offset=4'), [])
+        self.assertEqual(self.get_locations('?offset=100&limit=1'), [])
+        self.assertEqual(self.get_locations('?limit=0'), [])
+        self.assertEqual(self.get_locations('?offset=2&limit=0'), [])
+
+    def test_unknown_address(self):
+        response = self.client.get('/address/nobody/transactions')
+        self.assertEqual(response.get_json(),
+                         {'transactions': [], 'offset': 0, 'length': 0})
+
+    def test_invalid_page(self):
+        for query in ('offset=-1', 'limit=-1', 'limit=abc'):
+            with self.subTest(query=query):
+                response = self.client.get(self.path + '?' + query)
+                self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,254 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import node
+from block import Block
+from blockchain import Blockchain
+from transaction import Transaction
+from utility.mining import MiningEngine
+from utility.peer_client import PEER_WORKERS, PeerClient
+from wallet import Wallet
+
+
+class LocalResponse:
+    """The parts of a requests response the Blockchain uses."""
+
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.__response = response
+
+    def json(self):
+        return self.__response.get_json()
+
+
+class LocalPeerClient(PeerClient):
+    """Sends the requests to peer blockchains in this process (served by the
+    app of node.py) instead of over HTTP.
+
+    Attributes:
+        :peers: The Blockchains of the peer nodes by their URL.
+        :tamper: Called with the path and the JSON data of every response
+        (returns the data the Blockchain gets).
+        :hanging: The URLs of peer nodes which don't answer until release
+        is set.
+        :release: Set to let the hanging peer nodes answer.
+        :requests: The (node, path) tuples of all requests.
+    """
+
+    def __init__(self, peers, tamper=None, max_workers=PEER_WORKERS):
+        super().__init__(max_workers=max_workers)
+        self.peers = peers
+        self.tamper = tamper
+        self.hanging = set()
+        self.release = threading.Event()
+        self.requests = []
+        self.__lock = threading.Lock()
+
+    def request(self, node_url, method, path, **kwargs):
+        self.requests.append((node_url, path))
+        if node_url in self.hanging:
+            self.release.wait(10)
+        # The app serves the blockchain which is set in node.py
+        with self.__lock:
+            node.blockchain = self.peers[node_url]
+            response = node.app.test_client().open(
+                path, method=method, query_string=kwargs.get('params'),
+                json=kwargs.get('json'))
+        response = LocalResponse(response)
+        if self.tamper is not None:
+            data = self.tamper(path, response.json())
+            response.json = lambda: data
+        return response
+
+
+class ResolveTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.wallets = []
+        for port in (5000, 5001, 5002):
+            wallet = Wallet(port)
+            wallet.create_keys()
+            cls.wallets.append(wallet)
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.mkdtemp()
+        # The blockchains keep their files in the working directory
+        os.chdir(self.directory)
+        self.peer = Blockchain(self.wallets[1].public_key, 5001)
+        self.peer_client = LocalPeerClient({'peer': self.peer})
+        self.blockchain = Blockchain(self.wallets[0].public_key, 5000,
+                                     peer_client=self.peer_client)
+
+    def tearDown(self):
+        self.peer_client.release.set()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def assertSameChain(self, chain, expected):
+        self.assertEqual([block.hash for block in chain],
+                         [block.hash for block in expected])
+
+    def test_resolve_longer_chain(self):
+        self.blockchain.add_peer_node('peer')
+        # The peer gets the broadcast block and mines on top of it
+        self.blockchain.mine_block()
+        self.peer.mine_block()
+        self.peer.mine_block()
+        self.assertTrue(self.blockchain.resolve())
+        self.assertSameChain(self.blockchain.chain, self.peer.chain)
+        self.assertEqual(self.blockchain.get_balance(), 10)
+
+    def test_keep_longer_local_chain(self):
+        self.blockchain.mine_block()
+        self.blockchain.mine_block()
+        self.peer.mine_block()
+        self.blockchain.add_peer_node('peer')
+        self.assertFalse(self.blockchain.resolve())
+        self.assertEqual(self.blockchain.get_chain_length(), 3)
+
+    def test_resolve_across_fork(self):
+        self.blockchain.add_peer_node('peer')
+        self.blockchain.mine_block()
+        # Both chains continue with their own blocks (the peer declines the
+        # local ones)
+        for _ in range(3):
+            self.peer.mine_block()
+        self.blockchain.mine_block()
+        self.blockchain.mine_block()
+        self.assertTrue(self.blockchain.resolve_conflicts)
+        self.assertTrue(self.blockchain.resolve())
+        self.assertSameChain(self.blockchain.chain, self.peer.chain)
+        self.assertEqual(self.blockchain.get_balance(), 10)
+
+    def test_resolve_across_fork_in_mmap_store(self):
+        self.blockchain = Blockchain(self.wallets[0].public_key, 5000,
+                                     storage='mmap',
+                                     peer_client=self.peer_client)
+        self.blockchain.add_peer_node('peer')
+        self.blockchain.mine_block()
+        for _ in range(3):
+            self.peer.mine_block()
+        self.blockchain.mine_block()
+        inode = os.stat('blockchain-5000.blocks').st_ino
+        self.assertTrue(self.blockchain.resolve())
+        # The blocks after the fork point were replaced within the files
+        self.assertEqual(os.stat('blockchain-5000.blocks').st_ino, inode)
+        self.assertSameChain(self.blockchain.chain, self.peer.chain)
+        self.assertEqual(self.blockchain.get_balance(), 10)
+        restarted = Blockchain(self.wallets[0].public_key, 5000,
+                               storage='mmap')
+        self.assertSameChain(restarted.chain, self.peer.chain)
+        self.assertEqual(restarted.get_balance(), 10)
+
+    def test_reject_unlinked_headers(self):
+        def tamper(path, data):
+            if path.startswith('/headers/'):
+                data[-1]['previous_hash'] = data[0]['hash']
+            return data
+        self.peer.mine_block()
+        self.peer.mine_block()
+        self.peer.mine_block()
+        self.peer_client.tamper = tamper
+        self.blockchain.add_peer_node('peer')
+        self.assertFalse(self.blockchain.resolve())
+        self.assertEqual(self.blockchain.get_chain_length(), 1)
+
+    def test_reject_blocks_not_matching_headers(self):
+        def tamper(path, data):
+            if path == '/chain':
+                data['blocks'][-1]['timestamp'] += 1
+            return data
+        self.peer.mine_block()
+        self.peer.mine_block()
+        self.peer_client.tamper = tamper
+        self.blockchain.add_peer_node('peer')
+        self.assertFalse(self.blockchain.resolve())
+        self.assertEqual(self.blockchain.get_chain_length(), 1)
+
+    def test_reject_bad_signature(self):
+        self.peer.mine_block()
+        # A block with a valid proof whose transaction was signed for another
+        # amount (received blocks are only checked for their proof)
+        public_key = self.wallets[1].public_key
+        signature = self.wallets[1].sign_transaction(public_key, 'bob', 1)
+        transaction = Transaction(public_key, 'bob', signature, 2)
+        last_hash = self.peer.get_last_blockchain_value().hash
+        proof = MiningEngine.for_block([transaction], last_hash).search()
+        block = Block(2, last_hash,
+                      [transaction, Transaction('MINING', public_key, '', 10)],
+                      proof)
+        self.assertTrue(self.peer.add_block(block.to_dict()))
+        self.blockchain.add_peer_node('peer')
+        for processes in (1, 2):
+            with self.subTest(processes=processes):
+                self.blockchain.verify_processes = processes
+                self.assertFalse(self.blockchain.resolve())
+                self.assertEqual(self.blockchain.get_chain_length(), 1)
+
+    def test_hanging_peer_times_out(self):
+        self.peer.mine_block()
+        self.peer_client.hanging.add('peer')
+        self.blockchain.add_peer_node('peer')
+        start = time.time()
+        with mock.patch('blockchain.RESOLVE_TIMEOUT', 0.2):
+            self.assertFalse(self.blockchain.resolve())
+        self.assertLess(time.time() - start, 2)
+        self.assertFalse(self.blockchain.resolve_conflicts)
+        self.assertEqual(self.blockchain.get_chain_length(), 1)
+
+    def test_waiting_peers_are_cancelled(self):
+        # A single worker thread: the first peer hangs and the second one
+        # waits for the worker until resolve gives up
+        self.peer_client = LocalPeerClient(
+            {'peer': self.peer, 'other': self.peer}, max_workers=1)
+        self.peer_client.hanging.update(['peer', 'other'])
+        self.blockchain = Blockchain(self.wallets[0].public_key, 5000,
+                                     peer_client=self.peer_client)
+        self.blockchain.add_peer_node('peer')
+        self.blockchain.add_peer_node('other')
+        with mock.patch('blockchain.RESOLVE_TIMEOUT', 0.2):
+            self.assertFalse(self.blockchain.resolve())
+        self.peer_client.release.set()
+        self.peer_client.submit(lambda: None).result()
+        self.assertEqual(len(set(node for (node, _)
+                                 in self.peer_client.requests)), 1)
+
+    def test_hanging_peer_doesnt_delay_longer_chain(self):
+        self.peer.mine_block()
+        self.peer_client.peers['hanging'] = self.peer
+        self.peer_client.hanging.add('hanging')
+        self.blockchain.add_peer_node('hanging')
+        self.blockchain.add_peer_node('peer')
+        start = time.time()
+        self.assertTrue(self.blockchain.resolve())
+        self.assertLess(time.time() - start, 5)
+        self.assertSameChain(self.blockchain.chain, self.peer.chain)
+
+    def test_first_longer_chain_stops_search(self):
+        other = Blockchain(self.wallets[2].public_key, 5002)
+        other.mine_block()
+        other.mine_block()
+        self.peer.mine_block()
+        self.peer.mine_block()
+        self.peer_client.peers['other'] = other
+        self.blockchain.add_peer_node('peer')
+        self.blockchain.add_peer_node('other')
+        self.assertTrue(self.blockchain.resolve())
+        # Only the blocks of the chain which replaced the local one were
+        # downloaded
+        downloads = [node for (node, path) in self.peer_client.requests
+                     if path == '/chain']
+        self.assertEqual(len(downloads), 1)
+        winner = self.peer if downloads[0] == 'peer' else other
+        self.assertSameChain(self.blockchain.chain, winner.chain)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from tests.block_file_tests import BlockFileTests
+from utility.transaction_index import TransactionIndex
+
+
+class TransactionIndexTest(BlockFileTests, unittest.TestCase):
+    extension = '.txindex'
+
+    def open(self, path):
+        return TransactionIndex(path)
+
+    def assertLoaded(self, index, chain):
+        # The rewards all have the same ID, they are located in every block
+        self.assertEqual(len(index), len(chain) + 1)
+        for block in chain:
+            self.assertEqual(index.get_locations(block.transactions[0].id),
+                             [(block.index, 0)])
+        self.assertEqual(index.get_locations(chain[-1].transactions[1].id),
+                         [(block.index, 1) for block in chain])
+
+    def test_unknown_id(self):
+        index = self.rebuild(self.chain)
+        self.assertEqual(index.get_locations('00' * 32), [])
+        self.assertEqual(index.get_locations('not an id'), [])
+        for block in self.fork[3:]:
+            self.assertEqual(index.get_locations(block.transactions[0].id),
+                             [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from block import Block
+from blockchain import Blockchain
+from transaction import Transaction
+from utility.mining import MiningEngine
+from utility.transaction_pool import TransactionPool
+from wallet import Wallet
+
+
+class TransactionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.payment = Transaction('alice', 'bob', 'signature', 1)
+        self.repeated = Transaction('alice', 'bob', 'signature', 1)
+        self.other = Transaction('alice', 'carol', 'signature', 1)
+
+    def test_order_and_lookup(self):
+        pool = TransactionPool([self.payment, self.other, self.repeated])
+        self.assertEqual(list(pool), [self.payment, self.other,
+                                      self.repeated])
+        self.assertIs(pool.get(self.payment.id), self.payment)
+        self.assertIsNone(pool.get('unknown'))
+
+    def test_remove_one_occurrence(self):
+        pool = TransactionPool([self.payment, self.other, self.repeated])
+        self.assertIs(pool.remove(self.payment.id), self.payment)
+        self.assertEqual(list(pool), [self.other, self.repeated])
+        self.assertIs(pool.remove(self.payment.id), self.repeated)
+        self.assertIsNone(pool.remove(self.payment.id))
+        self.assertEqual(list(pool), [self.other])
+
+    def test_remove_confirmed(self):
+        pool = TransactionPool([self.payment, self.other, self.repeated])
+        pool.remove_confirmed(Block(1, '', [self.repeated], 0, 1))
+        self.assertEqual(list(pool), [self.other, self.repeated])
+
+
+class RepeatedPaymentTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.wallet = Wallet(5000)
+        cls.wallet.create_keys()
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.mkdtemp()
+        # The blockchain keeps its files in the working directory
+        os.chdir(self.directory)
+        self.blockchain = Blockchain(self.wallet.public_key, 5000)
+        self.blockchain.mine_block()
+        self.signature = self.wallet.sign_transaction(
+            self.wallet.public_key, 'bob', 1)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def pay(self):
+        return self.blockchain.add_transaction(
+            'bob', self.wallet.public_key, self.signature, 1)
+
+    def test_repeated_payment_is_accepted(self):
+        self.assertTrue(self.pay())
+        self.assertTrue(self.pay())
+        self.assertEqual(len(self.blockchain.get_open_transactions()), 2)
+        self.assertEqual(self.blockchain.get_balance(), 8)
+        block = self.blockchain.mine_block()
+        self.assertEqual(len(block.transactions), 3)
+        self.assertEqual(self.blockchain.get_open_transactions(), [])
+        self.assertEqual(self.blockchain.get_balance(), 18)
+        self.assertEqual(self.blockchain.get_balance('bob'), 2)
+
+    def test_received_block_confirms_one_payment(self):
+        self.pay()
+        self.pay()
+        transaction = Transaction(self.wallet.public_key, 'bob',
+                                  self.signature, 1)
+        last_hash = self.blockchain.get_last_blockchain_value().hash
+        proof = MiningEngine.for_block([transaction], last_hash).search()
+        block = Block(2, last_hash,
+                      [transaction, Transaction('MINING', 'carol', '', 10)],
+                      proof)
+        self.assertTrue(self.blockchain.add_block(block.to_dict()))
+        self.assertEqual(len(self.blockchain.get_open_transactions()), 1)
+        self.assertEqual(self.blockchain.get_balance(), 8)
+        # The pool is written to the data file as well
+        blockchain = Blockchain(self.wallet.public_key, 5000)
+        self.assertEqual(len(blockchain.get_open_transactions()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+from block import Block
+from transaction import Transaction
+from utility.mining import MiningEngine
+from utility.verification import Verification
+from wallet import Wallet
+
+
+class FindInvalidBlockTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.wallet = Wallet(1)
+        cls.wallet.create_keys()
+        cls.signature = cls.wallet.sign_transaction(cls.wallet.public_key,
+                                                    'bob', 1)
+
+    def make_chain(self, length, forged=None):
+        """Create a valid chain whose block at index forged has a transaction
+        with a signature for another amount."""
+        chain = [Block(0, '', [], 100, 0)]
+        for index in range(1, length):
+            amount = 2 if index == forged else 1
+            transaction = Transaction(self.wallet.public_key, 'bob',
+                                      self.signature, amount)
+            proof = MiningEngine.for_block([transaction],
+                                           chain[-1].hash).search()
+            reward = Transaction('MINING', self.wallet.public_key, '', 10)
+            chain.append(Block(index, chain[-1].hash, [transaction, reward],
+                               proof, index))
+        return chain
+
+    def test_valid_chain(self):
+        chain = self.make_chain(8)
+        for processes in (1, 2):
+            with self.subTest(processes=processes):
+                self.assertIsNone(Verification.find_invalid_block(
+                    chain, processes, chunk_size=3))
+
+    def test_bad_signature(self):
+        for forged in (1, 4, 7):
+            chain = self.make_chain(8, forged)
+            for processes in (1, 2):
+                with self.subTest(forged=forged, processes=processes):
+                    self.assertEqual(Verification.find_invalid_block(
+                        chain, processes, chunk_size=3), forged)
+
+    def test_broken_link(self):
+        chain = self.make_chain(8)
+        chain[5] = Block(5, chain[3].hash, chain[5].transactions,
+                         chain[5].proof, 5)
+        for processes in (1, 2):
+            with self.subTest(processes=processes):
+                self.assertEqual(Verification.find_invalid_block(
+                    chain, processes, chunk_size=3), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
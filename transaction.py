@@ -1,5 +1,7 @@
 from collections import OrderedDict
 
+from utility.address_table import addresses
+from utility.hash_util import hash_string_256
 from utility.printable import Printable
 
 
@@ -11,13 +13,107 @@ class Transaction(Printable):
         :recipient: The recipient of the coins.
         :signature: The signature of the transaction.
         :amount: The amount of coins sent.
+        :id: The ID of the transaction (derived from its content).
+        :sender_id: The interned ID of the sender (see AddressTable).
+        :recipient_id: The interned ID of the recipient.
+
+    The attributes are stored in slots (no per-instance __dict__), use
+    to_dict/from_dict to convert transactions. Sender and recipient are only
+    stored as address IDs.
+
+    Transactions received from other nodes are created with intern=False
+    until they are accepted, so that rejected transactions don't add their
+    addresses to the (never shrinking) address table. Their unknown
+    addresses are kept with the transaction and have no ID (None) until
+    intern_addresses is called.
     """
+    __slots__ = ('sender_id', 'recipient_id', 'amount', 'signature', '__id',
+                 '__addresses')
 
-    def __init__(self, sender, recipient, signature, amount):
-        self.sender = sender
-        self.recipient = recipient
+    def __init__(self, sender, recipient, signature, amount, intern=True):
+        if intern:
+            self.sender_id = addresses.intern(sender)
+            self.recipient_id = addresses.intern(recipient)
+            self.__addresses = None
+        else:
+            self.sender_id = addresses.get_id(sender)
+            self.recipient_id = addresses.get_id(recipient)
+            self.__addresses = (sender, recipient)
         self.amount = amount
         self.signature = signature
+        self.__id = None
+
+    @property
+    def sender(self):
+        """The sender of the coins."""
+        if self.sender_id is None:
+            return self.__addresses[0]
+        return addresses.lookup(self.sender_id)
+
+    @property
+    def recipient(self):
+        """The recipient of the coins."""
+        if self.recipient_id is None:
+            return self.__addresses[1]
+        return addresses.lookup(self.recipient_id)
+
+    def intern_addresses(self):
+        """Intern the addresses of a transaction which was created with
+        intern=False (once it was accepted)."""
+        if self.__addresses is not None:
+            (sender, recipient) = self.__addresses
+            self.sender_id = addresses.intern(sender)
+            self.recipient_id = addresses.intern(recipient)
+            self.__addresses = None
+
+    @property
+    def id(self):
+        """The (cached) ID of this transaction: the hash of all signed data
+        and the signature."""
+        if self.__id is None:
+            # The amount is signed as a string (see Wallet.sign_transaction)
+            self.__id = hash_string_256(
+                '\n'.join([str(self.sender), str(self.recipient),
+                           str(self.amount), str(self.signature)]).encode())
+        return self.__id
+
+    @classmethod
+    def from_ids(cls, sender_id, recipient_id, signature, amount):
+        """Creates a transaction from already interned address IDs."""
+        transaction = cls.__new__(cls)
+        transaction.sender_id = sender_id
+        transaction.recipient_id = recipient_id
+        transaction.amount = amount
+        transaction.signature = signature
+        transaction.__id = None
+        transaction.__addresses = None
+        return transaction
+
+    def __reduce__(self):
+        # Address IDs are only valid in the process which interned them, so
+        # the addresses themselves are pickled (e.g. for the verification
+        # processes)
+        return (self.__class__,
+                (self.sender, self.recipient, self.signature, self.amount))
+
+    @classmethod
+    def from_dict(cls, tx, intern=True):
+        """Creates a transaction from a dictionary (see to_dict)."""
+        return cls(tx['sender'],
+                   tx['recipient'],
+                   tx['signature'],
+                   tx['amount'],
+                   intern)
+
+    def to_dict(self):
+        """Converts this transaction into a (JSON serializable)
+        dictionary."""
+        return {
+            'sender': self.sender,
+            'recipient': self.recipient,
+            'amount': self.amount,
+            'signature': self.signature
+        }
 
     def to_ordered_dict(self):
         """Converts this transaction into a (hashable) OrderedDict."""
@@ -0,0 +1,71 @@
+"""Provides an index of the confirmed transactions by their addresses."""
+
+from array import array
+
+from utility.address_table import addresses
+
+
+class AddressIndex:
+    """Maps the addresses (senders and recipients) to the locations of their
+    transactions in the chain (the height of the block and the position in
+    it), so that the history of an address can be looked up without
+    scanning the chain.
+
+    Like the Ledger, the index is updated whenever a block is appended to the
+    chain. The locations are kept in the order of the chain, as flat arrays
+    of (height, position) pairs by address ID.
+    """
+
+    def __init__(self):
+        self.__locations = {}
+
+    def rebuild(self, chain):
+        """Index a whole chain.
+
+        Arguments:
+            :chain: The blocks of the blockchain.
+        """
+        self.__locations = {}
+        for block in chain:
+            self.add_block(block)
+
+    def add_block(self, block):
+        """Add the transactions of a block which was appended to the chain.
+
+        Arguments:
+            :block: The appended block.
+        """
+        for (position, tx) in enumerate(block.transactions):
+            self.__add(tx.sender_id, block.index, position)
+            if tx.recipient_id != tx.sender_id:
+                self.__add(tx.recipient_id, block.index, position)
+
+    def count(self, address):
+        """Return the number of transactions of an address."""
+        locations = self.__get(address)
+        return len(locations) // 2
+
+    def get_locations(self, address, offset=0, limit=None):
+        """Return the (height, position) tuples of the transactions of an
+        address.
+
+        Arguments:
+            :address: The address (public key).
+            :offset: The number of transactions to skip.
+            :limit: The maximum number of transactions (all by default).
+        """
+        locations = self.__get(address)
+        stop = len(locations) if limit is None else 2 * (offset + limit)
+        pairs = locations[2 * offset:stop]
+        return list(zip(pairs[::2], pairs[1::2]))
+
+    def __get(self, address):
+        address_id = addresses.get_id(address)
+        return self.__locations.get(address_id, array('I'))
+
+    def __add(self, address_id, height, position):
+        locations = self.__locations.get(address_id)
+        if locations is None:
+            locations = self.__locations[address_id] = array('I')
+        locations.append(height)
+        locations.append(position)
@@ -0,0 +1,47 @@
+"""Provides the table of interned addresses."""
+
+import threading
+
+
+class AddressTable:
+    """Maps addresses (hex encoded public keys, 'MINING') to small integer IDs
+    so that every address is only kept in memory once and can be compared as
+    an integer. Addresses are never removed from the table.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__ids = {}
+        self.__addresses = []
+
+    def __len__(self):
+        return len(self.__addresses)
+
+    def intern(self, address):
+        """Return the ID of an address (adding it to the table if needed).
+
+        Arguments:
+            :address: The address.
+        """
+        address_id = self.__ids.get(address)
+        if address_id is not None:
+            return address_id
+        with self.__lock:
+            address_id = self.__ids.get(address)
+            if address_id is None:
+                address_id = len(self.__addresses)
+                self.__addresses.append(address)
+                self.__ids[address] = address_id
+            return address_id
+
+    def get_id(self, address):
+        """Return the ID of an address (None if it isn't in the table)."""
+        return self.__ids.get(address)
+
+    def lookup(self, address_id):
+        """Return the address of an ID."""
+        return self.__addresses[address_id]
+
+
+# The table shared by all transactions
+addresses = AddressTable()
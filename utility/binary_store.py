@@ -0,0 +1,312 @@
+"""Provides a compact binary storage format for the blockchain.
+
+A snapshot file is converted into a binary store file from the repository
+root (the module imports block and transaction from there):
+
+    python -m utility.binary_store blockchain-5000.txt blockchain-5000.bin
+"""
+
+import binascii
+import json
+import os
+import struct
+
+from block import Block
+from transaction import Transaction
+from utility.address_table import addresses
+from utility.transaction_pool import TransactionPool
+
+# The first bytes of every binary store file (plus a format version)
+MAGIC = b'BCHN\x01'
+
+# The record types
+ADDRESS = b'A'
+BLOCK = b'B'
+TRANSACTION = b'T'
+ADD_PEER = b'P'
+REMOVE_PEER = b'R'
+
+# Every record starts with its type and the length of its payload
+RECORD_HEADER = struct.Struct('<cI')
+UINT32 = struct.Struct('<I')
+INT64 = struct.Struct('<q')
+DOUBLE = struct.Struct('<d')
+
+# The kinds of values: numbers keep their kind (JSON distinguishes 1 and
+# 1.0, so the hashes depend on it), strings are stored as raw bytes if they
+# are hex encoded (hashes, keys and signatures) and anything else as JSON
+INT_VALUE = 0
+FLOAT_VALUE = 1
+HEX_VALUE = 2
+TEXT_VALUE = 3
+JSON_VALUE = 4
+
+
+def pack_value(value):
+    """Pack a number, string or other JSON serializable value (with its
+    kind) into bytes."""
+    if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+        return bytes([INT_VALUE]) + INT64.pack(value)
+    if type(value) is float:
+        return bytes([FLOAT_VALUE]) + DOUBLE.pack(value)
+    if type(value) is str:
+        try:
+            raw = binascii.unhexlify(value)
+            # Only lowercase hex survives the round trip
+            if binascii.hexlify(raw).decode('ascii') == value:
+                return bytes([HEX_VALUE]) + UINT32.pack(len(raw)) + raw
+        except (binascii.Error, ValueError):
+            pass
+        raw = value.encode('utf8')
+        return bytes([TEXT_VALUE]) + UINT32.pack(len(raw)) + raw
+    raw = json.dumps(value).encode('utf8')
+    return bytes([JSON_VALUE]) + UINT32.pack(len(raw)) + raw
+
+
+def unpack_value(buffer, offset):
+    """Unpack a value packed by pack_value and return a (value, offset after
+    the value) tuple."""
+    kind = buffer[offset]
+    if kind == INT_VALUE:
+        return INT64.unpack_from(buffer, offset + 1)[0], offset + 9
+    if kind == FLOAT_VALUE:
+        return DOUBLE.unpack_from(buffer, offset + 1)[0], offset + 9
+    (length,) = UINT32.unpack_from(buffer, offset + 1)
+    start = offset + 1 + UINT32.size
+    raw = bytes(buffer[start:start + length])
+    if kind == HEX_VALUE:
+        value = binascii.hexlify(raw).decode('ascii')
+    elif kind == TEXT_VALUE:
+        value = raw.decode('utf8')
+    else:
+        value = json.loads(raw.decode('utf8'))
+    return value, start + length
+
+
+def pack_transaction(tx, address_ids):
+    """Pack a transaction into bytes.
+
+    Arguments:
+        :tx: The transaction.
+        :address_ids: Returns the (file) ID for an in-memory address ID.
+    """
+    return (UINT32.pack(address_ids(tx.sender_id)) +
+            UINT32.pack(address_ids(tx.recipient_id)) +
+            pack_value(tx.amount) +
+            pack_value(tx.signature))
+
+
+def unpack_transaction(buffer, offset, file_addresses):
+    """Unpack a transaction and return a (transaction, offset) tuple.
+
+    Arguments:
+        :file_addresses: The in-memory address IDs by their file ID.
+    """
+    (sender_id,) = UINT32.unpack_from(buffer, offset)
+    (recipient_id,) = UINT32.unpack_from(buffer, offset + 4)
+    amount, offset = unpack_value(buffer, offset + 8)
+    signature, offset = unpack_value(buffer, offset)
+    return Transaction.from_ids(file_addresses[sender_id],
+                                file_addresses[recipient_id],
+                                signature,
+                                amount), offset
+
+
+def pack_block(block, address_ids):
+    """Pack a block (and its transactions) into bytes (see
+    pack_transaction)."""
+    return b''.join([pack_value(block.index),
+                     pack_value(block.proof),
+                     pack_value(block.timestamp),
+                     pack_value(block.previous_hash),
+                     UINT32.pack(len(block.transactions))] +
+                    [pack_transaction(tx, address_ids)
+                     for tx in block.transactions])
+
+
+def unpack_block(buffer, offset, file_addresses):
+    """Unpack a block and return a (block, offset) tuple (see
+    unpack_transaction)."""
+    index, offset = unpack_value(buffer, offset)
+    proof, offset = unpack_value(buffer, offset)
+    timestamp, offset = unpack_value(buffer, offset)
+    previous_hash, offset = unpack_value(buffer, offset)
+    (count,) = UINT32.unpack_from(buffer, offset)
+    offset += UINT32.size
+    transactions = []
+    for _ in range(count):
+        tx, offset = unpack_transaction(buffer, offset, file_addresses)
+        transactions.append(tx)
+    return Block(index, previous_hash, transactions, proof, timestamp), offset
+
+
+def pack_record(record_type, payload):
+    """Prefix a payload with its record type and length."""
+    return RECORD_HEADER.pack(record_type, len(payload)) + payload
+
+
+def file_address_ids(file_ids, records, file_addresses=None):
+    """Return a function which returns the file ID of an in-memory address ID
+    (see pack_transaction). New addresses get the next file ID and an
+    address record, which is appended to records (before the record which
+    uses the address).
+
+    Arguments:
+        :file_ids: The file IDs by the in-memory address IDs (updated).
+        :records: The list the new address records are appended to.
+        :file_addresses: The in-memory address IDs by their file ID (updated
+        if given).
+    """
+    def address_id(memory_id):
+        file_id = file_ids.get(memory_id)
+        if file_id is None:
+            file_id = len(file_ids)
+            file_ids[memory_id] = file_id
+            if file_addresses is not None:
+                file_addresses.append(memory_id)
+            records.append(pack_record(
+                ADDRESS, pack_value(addresses.lookup(memory_id))))
+        return file_id
+    return address_id
+
+
+class BinaryStore:
+    """Stores the blockchain in a compact binary file of length-prefixed
+    records. Like the BlockLog, changes are appended as records and loading
+    the data replays them.
+
+    Attributes:
+        :path: The path of the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # The IDs the addresses have in the file (by their in-memory ID)
+        self.__file_ids = {}
+
+    def load(self):
+        """Load the file and return a (chain, open_transactions, peer_nodes)
+        tuple or None if there is no file yet."""
+        try:
+            with open(self.path, mode='rb') as f:
+                buffer = memoryview(f.read())
+        except IOError:
+            return None
+        if bytes(buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError('{} is no binary store'.format(self.path))
+        chain = []
+        open_transactions = TransactionPool()
+        peer_nodes = set()
+        # The in-memory address IDs by their file ID
+        file_addresses = []
+        self.__file_ids = {}
+        offset = len(MAGIC)
+        while offset + RECORD_HEADER.size <= len(buffer):
+            record_type, length = RECORD_HEADER.unpack_from(buffer, offset)
+            start = offset + RECORD_HEADER.size
+            if start + length > len(buffer):
+                break
+            offset = start + length
+            if record_type == BLOCK:
+                block, _ = unpack_block(buffer, start, file_addresses)
+                chain.append(block)
+                open_transactions.remove_confirmed(block)
+            elif record_type == TRANSACTION:
+                tx, _ = unpack_transaction(buffer, start, file_addresses)
+                open_transactions.add(tx)
+            elif record_type == ADDRESS:
+                address, _ = unpack_value(buffer, start)
+                address_id = addresses.intern(address)
+                self.__file_ids[address_id] = len(file_addresses)
+                file_addresses.append(address_id)
+            elif record_type == ADD_PEER:
+                peer_nodes.add(bytes(buffer[start:offset]).decode('utf8'))
+            elif record_type == REMOVE_PEER:
+                peer_nodes.discard(bytes(buffer[start:offset]).decode('utf8'))
+        # A half written (last) record is removed, so that later records are
+        # appended after the last complete one
+        if offset != len(buffer):
+            with open(self.path, mode='r+b') as f:
+                f.truncate(offset)
+        return chain, list(open_transactions), peer_nodes
+
+    def snapshot(self, chain, open_transactions, peer_nodes):
+        """Rewrite the whole file with the given data and return the
+        chain."""
+        self.__file_ids = {}
+        records = []
+        for block in chain:
+            self.__add_block(block, records)
+        for tx in open_transactions:
+            self.__add_transaction(tx, records)
+        for node in peer_nodes:
+            records.append(pack_record(ADD_PEER, node.encode('utf8')))
+        self.__write(records, mode='wb')
+        return chain
+
+    def append_block(self, block):
+        """Append a new block to the file."""
+        records = []
+        self.__add_block(block, records)
+        self.__write(records)
+
+    def append_transaction(self, transaction):
+        """Append a new open transaction to the file."""
+        records = []
+        self.__add_transaction(transaction, records)
+        self.__write(records)
+
+    def append_peer(self, node, removed=False):
+        """Append the addition (or removal) of a peer node to the file."""
+        record_type = REMOVE_PEER if removed else ADD_PEER
+        self.__write([pack_record(record_type, node.encode('utf8'))])
+
+    def __write(self, records, mode='ab'):
+        if mode == 'ab':
+            with open(self.path, mode='ab') as f:
+                f.write(b''.join(records))
+            return
+        # A new file replaces the old one once it is complete
+        with open(self.path + '.tmp', mode='wb') as f:
+            f.write(MAGIC)
+            f.write(b''.join(records))
+        os.replace(self.path + '.tmp', self.path)
+
+    def __add_block(self, block, records):
+        address_ids = file_address_ids(self.__file_ids, records)
+        payload = pack_block(block, address_ids)
+        records.append(pack_record(BLOCK, payload))
+
+    def __add_transaction(self, tx, records):
+        address_ids = file_address_ids(self.__file_ids, records)
+        payload = pack_transaction(tx, address_ids)
+        records.append(pack_record(TRANSACTION, payload))
+
+
+def convert(source, destination):
+    """Convert a snapshot file (blockchain-<port>.txt) into a binary store
+    file.
+
+    Arguments:
+        :source: The path of the snapshot file.
+        :destination: The path of the binary store file.
+    """
+    with open(source, mode='r') as f:
+        file_content = f.readlines()
+    chain = [Block.from_dict(block)
+             for block in json.loads(file_content[0][:-1])]
+    open_transactions = [Transaction.from_dict(tx)
+                         for tx in json.loads(file_content[1][:-1])]
+    peer_nodes = set(json.loads(file_content[2]))
+    BinaryStore(destination).snapshot(chain, open_transactions, peer_nodes)
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    parser = ArgumentParser(
+        prog='python -m utility.binary_store',
+        description='Convert blockchain-<port>.txt into a binary store.')
+    parser.add_argument('source')
+    parser.add_argument('destination')
+    args = parser.parse_args()
+    convert(args.source, args.destination)
@@ -0,0 +1,119 @@
+"""Provides a base class for the files which keep data about every block."""
+
+import binascii
+import struct
+
+from utility.hash_util import block_hash_at, common_length
+
+# The first bytes of every block file (plus a format version)
+MAGIC = b'BLKF\x01'
+# Every entry starts with the (raw) hash of its block and the length of its
+# data
+ENTRY_HEADER = struct.Struct('<32sI')
+
+
+class BlockFile:
+    """Keeps data derived from the blocks of the chain in a file (one entry
+    per block, in the order of the chain) which new blocks are appended to.
+    That way the data doesn't have to be derived from the blocks again when a
+    node starts.
+
+    Subclasses keep the data in memory and implement _clear (which removes
+    it), _load (which adds the data of a stored entry) and _add (which adds a
+    block and returns the data of its entry).
+
+    Attributes:
+        :path: The path of the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def rebuild(self, chain):
+        """Load the data of a whole chain. The entries in the file are reused
+        for the blocks the file and the chain have in common.
+
+        Arguments:
+            :chain: The blocks of the blockchain.
+        """
+        stored = self.__read()
+        known = common_length([raw for (raw, _) in stored], chain)
+        self._clear()
+        for (height, (raw, data)) in enumerate(stored[:known]):
+            self._load(height, raw, data)
+        # Only the entries behind the blocks in common (e.g. the blocks of
+        # another fork) are replaced
+        if known < len(stored):
+            with open(self.path, mode='r+b') as f:
+                f.truncate(len(MAGIC) + sum(ENTRY_HEADER.size + len(data)
+                                            for (_, data) in stored[:known]))
+        entries = []
+        for height in range(known, len(chain)):
+            # Every block stores the hash of its predecessor, so only the hash
+            # of the last block has to be calculated
+            raw = self.__raw(block_hash_at(chain, height))
+            entries.append((raw, self._add(height, raw, chain[height])))
+        self.__write(entries)
+
+    def add(self, block):
+        """Add a block which was appended to the chain.
+
+        Arguments:
+            :block: The appended block.
+        """
+        raw = self.__raw(block.hash)
+        self.__write([(raw, self._add(block.index, raw, block))])
+
+    def _clear(self):
+        """Remove the data of all blocks."""
+        raise NotImplementedError
+
+    def _load(self, height, raw_hash, data):
+        """Add the data of a block stored in the file.
+
+        Arguments:
+            :height: The index of the block.
+            :raw_hash: The raw (not hex encoded) hash of the block.
+            :data: The data of the block's entry.
+        """
+        raise NotImplementedError
+
+    def _add(self, height, raw_hash, block):
+        """Add a block and return the data of its entry (see _load)."""
+        raise NotImplementedError
+
+    def __read(self):
+        """Return the (complete) entries stored in the file as (raw hash,
+        data) tuples."""
+        try:
+            with open(self.path, mode='rb') as f:
+                data = f.read()
+        except IOError:
+            return []
+        entries = []
+        # The data of a file without the magic bytes (e.g. a file of an
+        # older format) is derived from the blocks again
+        offset = len(MAGIC) if data[:len(MAGIC)] == MAGIC else 0
+        while offset and offset + ENTRY_HEADER.size <= len(data):
+            (raw, length) = ENTRY_HEADER.unpack_from(data, offset)
+            start = offset + ENTRY_HEADER.size
+            if start + length > len(data):
+                break
+            entries.append((raw, data[start:start + length]))
+            offset = start + length
+        # A half written (last) entry is removed from the file
+        if offset != len(data):
+            with open(self.path, mode='r+b') as f:
+                f.truncate(offset)
+        return entries
+
+    def __write(self, entries):
+        with open(self.path, mode='ab') as f:
+            if f.tell() == 0:
+                f.write(MAGIC)
+            f.write(b''.join(ENTRY_HEADER.pack(raw, len(data)) + data
+                             for (raw, data) in entries))
+
+    @staticmethod
+    def __raw(block_hash):
+        return binascii.unhexlify(block_hash)
@@ -0,0 +1,44 @@
+"""Provides an index of the blocks by their hash."""
+
+import binascii
+
+from utility.block_file import BlockFile
+
+
+class BlockIndex(BlockFile):
+    """Maps the hashes of the blocks in the chain to their height (index) so
+    that a block can be found by its hash without hashing the chain.
+
+    The hashes are also kept in a block file (the hash of an entry is all it
+    needs) which new blocks are appended to. That way the index doesn't have
+    to be recalculated when a node starts.
+
+    Attributes:
+        :path: The path of the index file.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        # The heights by the raw hashes
+        self.__heights = {}
+
+    def __len__(self):
+        return len(self.__heights)
+
+    def get_height(self, block_hash):
+        """Return the height of the block with the given (hex encoded) hash
+        (None if there is no such block)."""
+        try:
+            return self.__heights.get(binascii.unhexlify(block_hash))
+        except ValueError:
+            return None
+
+    def _clear(self):
+        self.__heights = {}
+
+    def _load(self, height, raw_hash, data):
+        self.__heights[raw_hash] = height
+
+    def _add(self, height, raw_hash, block):
+        self.__heights[raw_hash] = height
+        return b''
@@ -0,0 +1,173 @@
+"""Provides an append-only storage log for the blockchain."""
+
+import json
+import os
+
+from block import Block
+from transaction import Transaction
+from utility.address_table import addresses
+from utility.transaction_pool import TransactionPool
+
+
+class BlockLog:
+    """Stores the blockchain as an append-only log of JSON records (one per
+    line) so that every change only costs a write proportional to its own
+    size. Loading the data replays the log from top to bottom.
+
+    Addresses are written once per log (as 'address' records) and referred to
+    by their ID in the log afterwards.
+
+    Attributes:
+        :path: The path of the log file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # The IDs the addresses have in the log (by their in-memory ID)
+        self.__log_ids = {}
+
+    def load(self):
+        """Replay the log and return a (chain, open_transactions, peer_nodes)
+        tuple or None if there is no log yet."""
+        chain = []
+        open_transactions = TransactionPool()
+        peer_nodes = set()
+        # The addresses by their ID in the log
+        log_addresses = {}
+        self.__log_ids = {}
+        # The size of the complete lines read so far
+        size = 0
+        try:
+            with open(self.path, mode='rb') as f:
+                for line in f:
+                    # A half written (last) line is removed below
+                    if not line.endswith(b'\n'):
+                        break
+                    size += len(line)
+                    record = json.loads(line.decode('utf8'))
+                    op = record['op']
+                    if op == 'address':
+                        log_addresses[record['id']] = record['address']
+                        address_id = addresses.intern(record['address'])
+                        self.__log_ids[address_id] = record['id']
+                    elif op == 'snapshot':
+                        chain = [self.__load_block(block, log_addresses)
+                                 for block in record['chain']]
+                        open_transactions = TransactionPool(
+                            self.__load_transaction(tx, log_addresses)
+                            for tx in record['open_transactions'])
+                        peer_nodes = set(record['peer_nodes'])
+                    elif op == 'block':
+                        block = self.__load_block(record['block'],
+                                                  log_addresses)
+                        chain.append(block)
+                        open_transactions.remove_confirmed(block)
+                    elif op == 'transaction':
+                        open_transactions.add(self.__load_transaction(
+                            record['transaction'], log_addresses))
+                    elif op == 'add_peer':
+                        peer_nodes.add(record['node'])
+                    elif op == 'remove_peer':
+                        peer_nodes.discard(record['node'])
+        except IOError:
+            return None
+        # Later records are appended after the last complete line
+        if size != os.path.getsize(self.path):
+            with open(self.path, mode='r+b') as f:
+                f.truncate(size)
+        return chain, list(open_transactions), peer_nodes
+
+    def snapshot(self, chain, open_transactions, peer_nodes):
+        """Replace the whole log with a single snapshot record (used for
+        chain replacements and to compact the log) and return the chain."""
+        self.__log_ids = {}
+        records = []
+        snapshot = {
+            'op': 'snapshot',
+            'chain': [self.__dump_block(block, records) for block in chain],
+            'open_transactions': [self.__dump_transaction(tx, records)
+                                  for tx in open_transactions],
+            'peer_nodes': list(peer_nodes)
+        }
+        records.append(snapshot)
+        self.__write(records, mode='w')
+        return chain
+
+    def append_block(self, block):
+        """Append a new block to the log."""
+        records = []
+        dumped_block = self.__dump_block(block, records)
+        records.append({'op': 'block', 'block': dumped_block})
+        self.__write(records)
+
+    def append_transaction(self, transaction):
+        """Append a new open transaction to the log."""
+        records = []
+        dumped_transaction = self.__dump_transaction(transaction, records)
+        records.append({'op': 'transaction',
+                        'transaction': dumped_transaction})
+        self.__write(records)
+
+    def append_peer(self, node, removed=False):
+        """Append the addition (or removal) of a peer node to the log."""
+        op = 'remove_peer' if removed else 'add_peer'
+        self.__write([{'op': op, 'node': node}])
+
+    def __write(self, records, mode='a'):
+        data = ''.join(json.dumps(record) + '\n' for record in records)
+        if mode == 'a':
+            with open(self.path, mode='a') as f:
+                f.write(data)
+            return
+        # A new log replaces the old one once it is complete
+        with open(self.path + '.tmp', mode='w') as f:
+            f.write(data)
+        os.replace(self.path + '.tmp', self.path)
+
+    def __log_id(self, address_id, records):
+        """Return the log ID of an address, adding an 'address' record for
+        new addresses."""
+        log_id = self.__log_ids.get(address_id)
+        if log_id is None:
+            log_id = len(self.__log_ids)
+            self.__log_ids[address_id] = log_id
+            records.append({'op': 'address',
+                            'id': log_id,
+                            'address': addresses.lookup(address_id)})
+        return log_id
+
+    def __dump_transaction(self, tx, records):
+        return [self.__log_id(tx.sender_id, records),
+                self.__log_id(tx.recipient_id, records),
+                tx.amount,
+                tx.signature]
+
+    def __dump_block(self, block, records):
+        return {
+            'index': block.index,
+            'previous_hash': block.previous_hash,
+            'timestamp': block.timestamp,
+            'transactions': [self.__dump_transaction(tx, records)
+                             for tx in block.transactions],
+            'proof': block.proof
+        }
+
+    @staticmethod
+    def __load_transaction(tx, log_addresses):
+        # Logs written before addresses were interned store dictionaries
+        if isinstance(tx, dict):
+            return Transaction.from_dict(tx)
+        (sender, recipient, amount, signature) = tx
+        return Transaction(log_addresses[sender],
+                           log_addresses[recipient],
+                           signature,
+                           amount)
+
+    @classmethod
+    def __load_block(cls, block, log_addresses):
+        return Block(block['index'],
+                     block['previous_hash'],
+                     [cls.__load_transaction(tx, log_addresses)
+                      for tx in block['transactions']],
+                     block['proof'],
+                     block['timestamp'])
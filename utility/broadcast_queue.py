@@ -0,0 +1,140 @@
+"""Provides a queue which ships broadcasts to peer nodes in the background."""
+
+import queue
+import threading
+
+# The maximum number of broadcasts waiting to be shipped
+BROADCAST_QUEUE_SIZE = 1000
+# The maximum number of broadcasts which are shipped together
+BROADCAST_BATCH_SIZE = 50
+
+# Put into the queue to stop the worker
+_STOP = object()
+
+
+class BroadcastQueue:
+    """Ships broadcasts to peer nodes from a background worker so that the
+    request which caused them doesn't have to wait for the peers.
+
+    The worker takes all waiting broadcasts (up to batch_size) at once and
+    sends them to all of their peers concurrently. New broadcasts are dropped
+    (and counted) while the queue is full.
+
+    Attributes:
+        :peer_client: The PeerClient used to send the broadcasts.
+        :batch_size: The maximum number of broadcasts shipped together.
+    """
+
+    def __init__(self, peer_client, max_size=BROADCAST_QUEUE_SIZE,
+                 batch_size=BROADCAST_BATCH_SIZE):
+        self.peer_client = peer_client
+        self.batch_size = batch_size
+        self.__queue = queue.Queue(maxsize=max_size)
+        self.__lock = threading.Lock()
+        self.__stats = {
+            'enqueued': 0,
+            'dropped': 0,
+            'shipped': 0,
+            'failed': 0,
+            'batches': 0,
+            'high_watermark': 0
+        }
+        self.__closed = False
+        self.__worker = threading.Thread(target=self.__run, daemon=True)
+        self.__worker.start()
+
+    def put(self, nodes, path, payload, callback=None):
+        """Queue a broadcast and return True (False if it was dropped because
+        the queue is full or closed).
+
+        Arguments:
+            :nodes: The URLs of the peer nodes.
+            :path: The path of the request.
+            :payload: The JSON payload.
+            :callback: Called with the dictionary of responses once the
+            broadcast was shipped (see PeerClient.broadcast).
+        """
+        if self.__closed:
+            return False
+        try:
+            self.__queue.put_nowait((list(nodes), path, payload, callback))
+        except queue.Full:
+            with self.__lock:
+                self.__stats['dropped'] += 1
+            return False
+        with self.__lock:
+            self.__stats['enqueued'] += 1
+            self.__stats['high_watermark'] = max(
+                self.__stats['high_watermark'], self.__queue.qsize())
+        return True
+
+    def close(self, drain=True):
+        """Stop the worker. Must be called before the interpreter shuts down
+        (not from atexit), the PeerClient can't send requests afterwards.
+
+        Arguments:
+            :drain: Ship all queued broadcasts before stopping (otherwise
+            they are discarded).
+        """
+        if self.__closed:
+            return
+        self.__closed = True
+        if not drain:
+            try:
+                while True:
+                    self.__queue.get_nowait()
+            except queue.Empty:
+                pass
+        self.__queue.put(_STOP)
+        self.__worker.join()
+
+    def get_stats(self):
+        """Return the queue statistics (including the current depth)."""
+        with self.__lock:
+            stats = dict(self.__stats)
+        stats['depth'] = self.__queue.qsize()
+        stats['max_size'] = self.__queue.maxsize
+        return stats
+
+    def __run(self):
+        while True:
+            batch = [self.__queue.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self.__queue.get_nowait())
+            except queue.Empty:
+                pass
+            stop = _STOP in batch
+            batch = [item for item in batch if item is not _STOP]
+            # A failing batch mustn't stop the worker, nobody would read the
+            # queue anymore
+            try:
+                self.__ship(batch)
+            except Exception as error:
+                print('Shipping broadcasts failed: {}'.format(error))
+                with self.__lock:
+                    self.__stats['failed'] += len(batch)
+            if stop:
+                return
+
+    def __ship(self, batch):
+        # Send all requests of the batch concurrently
+        futures = [
+            {node: self.peer_client.submit(self.peer_client.post,
+                                           node, path, payload)
+             for node in nodes}
+            for (nodes, path, payload, callback) in batch
+        ]
+        for (item, item_futures) in zip(batch, futures):
+            callback = item[3]
+            responses = {node: future.result()
+                         for (node, future) in item_futures.items()}
+            if callback is not None:
+                try:
+                    callback(responses)
+                except Exception as error:
+                    print('Broadcast callback failed: {}'.format(error))
+        with self.__lock:
+            self.__stats['shipped'] += len(batch)
+            if batch:
+                self.__stats['batches'] += 1
@@ -0,0 +1,63 @@
+"""Provides a cache for the serialized chain."""
+
+import gzip
+import json
+import threading
+
+# Appended to the ETag of the gzip compressed body (which is a different
+# representation of the chain)
+GZIP_SUFFIX = '-gzip'
+
+
+class ChainCache:
+    """Keeps the serialized (JSON) chain until the tip of the chain changes,
+    so that it doesn't have to be rebuilt for every request.
+
+    The gzip compressed variant is only created once it is requested.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__etag = None
+        self.__body = None
+        self.__compressed_body = None
+
+    @staticmethod
+    def etag(blockchain, compressed=False):
+        """Return the ETag of a blockchain's chain (derived from its tip).
+
+        Arguments:
+            :blockchain: The Blockchain whose chain is served.
+            :compressed: Return the ETag of the gzip compressed body.
+        """
+        etag = _etag(blockchain.get_last_blockchain_value())
+        return etag + GZIP_SUFFIX if compressed else etag
+
+    def get(self, blockchain, compressed=False):
+        """Return an (etag, body) tuple for a blockchain's chain.
+
+        Arguments:
+            :blockchain: The Blockchain whose chain is served.
+            :compressed: Return the gzip compressed body.
+        """
+        last_block = blockchain.get_last_blockchain_value()
+        with self.__lock:
+            if _etag(last_block) != self.__etag:
+                # Blocks appended meanwhile belong to the next ETag, so only
+                # the blocks up to the tip are serialized (and the ETag is
+                # taken from them in case the chain was replaced)
+                blocks = list(blockchain.iter_blocks(0, last_block.index + 1))
+                self.__etag = _etag(blocks[-1])
+                self.__body = json.dumps(
+                    [block.to_dict() for block in blocks]).encode()
+                self.__compressed_body = None
+            if not compressed:
+                return self.__etag, self.__body
+            if self.__compressed_body is None:
+                self.__compressed_body = gzip.compress(self.__body)
+            return self.__etag + GZIP_SUFFIX, self.__compressed_body
+
+
+def _etag(last_block):
+    """Return the ETag of a chain with the given last block."""
+    return '{}-{}'.format(last_block.index + 1, last_block.hash)
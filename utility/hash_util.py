@@ -1,3 +1,4 @@
+import binascii
 import hashlib as hl
 import json
 
@@ -19,8 +20,60 @@ def hash_block(block):
     Arguments:
         :block: The block that should be hashed.
     """
-    hashable_block = block.__dict__.copy()
-    hashable_block['transactions'] = [
-        tx.to_ordered_dict() for tx in hashable_block['transactions']
-    ]
+    hashable_block = {
+        'index': block.index,
+        'previous_hash': block.previous_hash,
+        'timestamp': block.timestamp,
+        'transactions': [tx.to_ordered_dict() for tx in block.transactions],
+        'proof': block.proof
+    }
     return hash_string_256(json.dumps(hashable_block, sort_keys=True).encode())
+
+
+def hash_transactions(transactions):
+    """Hashes a list of transactions (including their signatures) and returns
+    a string representation of it.
+
+    Arguments:
+        :transactions: The transactions that should be hashed.
+    """
+    hashable_transactions = [tx.to_dict() for tx in transactions]
+    return hash_string_256(
+        json.dumps(hashable_transactions, sort_keys=True).encode())
+
+
+def block_hash_at(chain, height):
+    """Return the hash of the block at a height, taken from its successor if
+    there is one (so that it doesn't have to be calculated).
+
+    Arguments:
+        :chain: The blocks of the blockchain.
+        :height: The index of the block.
+    """
+    if height + 1 < len(chain):
+        return chain[height + 1].previous_hash
+    return chain[height].hash
+
+
+def common_length(raw_hashes, chain):
+    """Return the number of blocks a list of (raw) block hashes and a chain
+    have in common.
+
+    The hash of a block depends on all blocks before it, so if a hash matches
+    the chain all hashes before it match as well and the end of the common
+    blocks (the fork point) can be found by bisection.
+
+    Arguments:
+        :raw_hashes: The raw (not hex encoded) hashes of a chain's blocks.
+        :chain: The blocks of the blockchain.
+    """
+    low = 0
+    high = min(len(raw_hashes), len(chain))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if raw_hashes[middle - 1] == binascii.unhexlify(
+                block_hash_at(chain, middle - 1)):
+            low = middle
+        else:
+            high = middle - 1
+    return low
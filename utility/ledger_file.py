@@ -0,0 +1,81 @@
+"""Provides the file the ledger and the address index are loaded from."""
+
+from collections import namedtuple
+
+from utility.address_table import addresses
+from utility.binary_store import (RECORD_HEADER, UINT32, file_address_ids,
+                                  pack_value, unpack_value)
+from utility.block_file import BlockFile
+
+# The parts of a block and its transactions the ledger and the address index
+# are built from
+BlockTransfers = namedtuple('BlockTransfers', ['index', 'transactions'])
+Transfer = namedtuple('Transfer', ['sender_id', 'recipient_id', 'amount'])
+
+
+class LedgerFile(BlockFile):
+    """Keeps the sender, the recipient and the amount of every confirmed
+    transaction in a block file and updates a Ledger and an AddressIndex
+    with them. When a node starts, the balances, the checkpoints and the
+    address index are loaded from the file instead of from the (decoded)
+    blocks.
+
+    The entry of a block holds the address records of the addresses it uses
+    for the first time (in the binary store format) followed by its
+    transactions, which refer to the addresses by their order in the file.
+
+    Attributes:
+        :path: The path of the file.
+        :ledger: The Ledger which is updated.
+        :address_index: The AddressIndex which is updated.
+    """
+
+    def __init__(self, path, ledger, address_index):
+        super().__init__(path)
+        self.ledger = ledger
+        self.address_index = address_index
+        # The file IDs by the in-memory address IDs (and the other way)
+        self.__file_ids = {}
+        self.__file_addresses = []
+
+    def _clear(self):
+        self.ledger.rebuild([])
+        self.address_index.rebuild([])
+        self.__file_ids = {}
+        self.__file_addresses = []
+
+    def _load(self, height, raw_hash, data):
+        (count,) = UINT32.unpack_from(data, 0)
+        offset = UINT32.size
+        for _ in range(count):
+            address, offset = unpack_value(data, offset + RECORD_HEADER.size)
+            address_id = addresses.intern(address)
+            self.__file_ids[address_id] = len(self.__file_addresses)
+            self.__file_addresses.append(address_id)
+        (count,) = UINT32.unpack_from(data, offset)
+        offset += UINT32.size
+        transactions = []
+        for _ in range(count):
+            (sender_id,) = UINT32.unpack_from(data, offset)
+            (recipient_id,) = UINT32.unpack_from(data, offset + 4)
+            amount, offset = unpack_value(data, offset + 8)
+            transactions.append(Transfer(self.__file_addresses[sender_id],
+                                         self.__file_addresses[recipient_id],
+                                         amount))
+        self.__update(BlockTransfers(height, transactions))
+
+    def _add(self, height, raw_hash, block):
+        records = []
+        address_ids = file_address_ids(self.__file_ids, records,
+                                       self.__file_addresses)
+        transactions = [UINT32.pack(address_ids(tx.sender_id)) +
+                        UINT32.pack(address_ids(tx.recipient_id)) +
+                        pack_value(tx.amount)
+                        for tx in block.transactions]
+        self.__update(block)
+        return b''.join([UINT32.pack(len(records))] + records +
+                        [UINT32.pack(len(transactions))] + transactions)
+
+    def __update(self, block):
+        self.ledger.add_block(block)
+        self.address_index.add_block(block)
@@ -0,0 +1,120 @@
+"""Provides the proof of work mining engine."""
+
+import hashlib as hl
+import multiprocessing
+
+# The number of leading hex 0s a proof of work hash needs
+# (see Verification.valid_proof)
+DIFFICULTY = 2
+# The number of guesses a mining process makes between checking whether
+# another process already found a proof
+CHECK_INTERVAL = 1000
+
+
+class MiningEngine:
+    """Searches proof of work numbers for a block.
+
+    The hash input of a proof is the serialized transactions, followed by the
+    previous hash and the proof number (see Verification.valid_proof). Only
+    the proof changes between guesses, so the prefix is fed into a SHA256
+    object once and every guess only copies that state and appends the proof.
+
+    Attributes:
+        :prefix: The (encoded) hash input without the proof number.
+        :difficulty: The number of leading hex 0s a valid hash needs.
+    """
+
+    def __init__(self, prefix, difficulty=DIFFICULTY):
+        self.prefix = prefix
+        self.difficulty = difficulty
+        self.__midstate = hl.sha256(prefix)
+        # Compare whole 0 bytes and (for odd difficulties) the high nibble of
+        # the next byte instead of slicing the hex digest
+        self.__zero_bytes = bytes(difficulty // 2)
+        self.__half_byte = difficulty % 2 == 1
+
+    @classmethod
+    def for_block(cls, transactions, last_hash, difficulty=DIFFICULTY):
+        """Create an engine for the given transactions and previous hash.
+
+        Arguments:
+            :transactions: The transactions of the block for which the proof
+            is created.
+            :last_hash: The previous block's hash.
+        """
+        prefix = (str([tx.to_ordered_dict() for tx in transactions]) +
+                  str(last_hash)).encode()
+        return cls(prefix, difficulty)
+
+    def check(self, proof):
+        """Return True if the proof number solves the puzzle."""
+        guess = self.__midstate.copy()
+        guess.update(str(proof).encode())
+        digest = guess.digest()
+        zero_bytes = self.__zero_bytes
+        if digest[:len(zero_bytes)] != zero_bytes:
+            return False
+        return not self.__half_byte or digest[len(zero_bytes)] < 0x10
+
+    def search(self, start=0, step=1):
+        """Return the first valid proof number of start, start + step, ...
+
+        Arguments:
+            :start: The first proof number to try.
+            :step: The distance between two tried proof numbers.
+        """
+        check = self.check
+        proof = start
+        while not check(proof):
+            proof += step
+        return proof
+
+    def parallel_search(self, processes, lowest=True):
+        """Search a valid proof number with several processes. Process i
+        tries the proof numbers i, i + processes, i + 2 * processes, ...
+
+        Arguments:
+            :processes: The number of mining processes.
+            :lowest: Return the lowest valid proof number (the same one search
+            would return) if True, otherwise the first one found by any
+            process.
+        """
+        if processes <= 1:
+            return self.search()
+        best = multiprocessing.Value('q', -1)
+        found = multiprocessing.Event()
+        workers = [
+            multiprocessing.Process(
+                target=_search_worker,
+                args=(self.prefix, self.difficulty, start, processes, lowest,
+                      best, found),
+                daemon=True)
+            for start in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return best.value
+
+
+def _search_worker(prefix, difficulty, start, step, lowest, best, found):
+    """Search proof numbers for MiningEngine.parallel_search and store a found
+    proof in best (keeping the lowest one)."""
+    check = MiningEngine(prefix, difficulty).check
+    proof = start
+    while True:
+        for guess in range(proof, proof + CHECK_INTERVAL * step, step):
+            if check(guess):
+                with best.get_lock():
+                    if best.value < 0 or guess < best.value:
+                        best.value = guess
+                found.set()
+                return
+        proof += CHECK_INTERVAL * step
+        if lowest:
+            # Stop once all lower proof numbers of this process were tried
+            if 0 <= best.value < proof:
+                return
+        elif found.is_set():
+            return
@@ -0,0 +1,285 @@
+"""Provides a memory-mapped storage for the blockchain."""
+
+from collections import OrderedDict
+import mmap
+import os
+import struct
+import threading
+
+from utility.address_table import addresses
+from utility.binary_store import (ADDRESS, MAGIC, RECORD_HEADER, BinaryStore,
+                                  file_address_ids, pack_block, unpack_block,
+                                  unpack_value)
+from utility.transaction_pool import TransactionPool
+
+# The number of decoded blocks kept in memory
+BLOCK_CACHE_SIZE = 256
+# An entry of the index file: the offset and the length of a block
+INDEX_ENTRY = struct.Struct('<QI')
+
+
+class LazyChain:
+    """A chain of blocks which are kept in a MmapStore and only decoded
+    (materialized) when they are accessed.
+
+    Slicing from the start (chain[:n]) returns another lazy chain, all other
+    slices return lists of blocks. A lazy chain is pickled as a list of
+    blocks.
+    """
+
+    def __init__(self, store, length):
+        self.__store = store
+        self.__length = length
+
+    def __len__(self):
+        return self.__length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            (start, stop, step) = index.indices(self.__length)
+            if start == 0 and step == 1:
+                return LazyChain(self.__store, max(stop, 0))
+            return [self[i] for i in range(start, stop, step)]
+        if index < 0:
+            index += self.__length
+        if index < 0 or index >= self.__length:
+            raise IndexError('block index out of range')
+        return self.__store.read_block(index)
+
+    def __iter__(self):
+        for index in range(self.__length):
+            yield self[index]
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __reduce__(self):
+        # The store (and its lock) can't be pickled, the blocks can
+        return (list, (list(self),))
+
+    def append(self, block):
+        """Append a block to the chain (it's written to the store right
+        away)."""
+        self.__store.write_block(block)
+        self.__length += 1
+
+
+class MmapStore:
+    """Stores the blocks of the blockchain in a memory-mapped file so that
+    loading the data doesn't decode any block. An index file holds the
+    offset of every block, blocks are decoded when they are accessed (see
+    LazyChain) and the most recently used ones are kept in memory.
+
+    Neither does the Blockchain when it starts: its ledger and indexes are
+    loaded from their own files (see BlockFile), which only requires a few
+    blocks to find the blocks the files have in common with the chain. Only
+    the blocks stay bounded in memory though, the address and transaction
+    indexes keep an entry for every confirmed transaction.
+
+    The store consists of four files (all in the binary store format):
+        <path>.blocks: The encoded blocks.
+        <path>.idx: The offset and length of every block.
+        <path>.addr: The addresses used by the blocks.
+        <path>.state: The open transactions and the peer nodes (a
+        BinaryStore).
+
+    Attributes:
+        :path: The path of the files (without their extension).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.__blocks_path = path + '.blocks'
+        self.__index_path = path + '.idx'
+        self.__addresses_path = path + '.addr'
+        self.__state = BinaryStore(path + '.state')
+        self.__lock = threading.Lock()
+        # The decoded blocks by their index (least recently used first)
+        self.__cache = OrderedDict()
+        self.__blocks = None
+        self.__index = None
+        self.__length = 0
+        # The in-memory address IDs by their file ID (and the other way)
+        self.__file_addresses = []
+        self.__file_ids = {}
+
+    def load(self):
+        """Map the files and return a (chain, open_transactions, peer_nodes)
+        tuple or None if there are no files yet."""
+        if not os.path.exists(self.__index_path):
+            return None
+        with self.__lock:
+            self.__load_addresses()
+            self.__cache = OrderedDict()
+            self.__blocks = None
+            self.__index = None
+            size = os.path.getsize(self.__index_path)
+            self.__length = size // INDEX_ENTRY.size
+            # A half written (last) index entry is removed, so that later
+            # entries are appended after the last complete one
+            if size != self.__length * INDEX_ENTRY.size:
+                with open(self.__index_path, mode='r+b') as f:
+                    f.truncate(self.__length * INDEX_ENTRY.size)
+        state = self.__state.load()
+        if state is None:
+            state = ([], [], set())
+        (_, open_transactions, peer_nodes) = state
+        return LazyChain(self, self.__length), open_transactions, peer_nodes
+
+    def read_block(self, index):
+        """Return the block at an index (decoding it if it isn't cached)."""
+        with self.__lock:
+            block = self.__cache.get(index)
+            if block is not None:
+                self.__cache.move_to_end(index)
+                return block
+            entry_offset = index * INDEX_ENTRY.size
+            self.__index = self.__map(self.__index, self.__index_path,
+                                      entry_offset + INDEX_ENTRY.size)
+            (offset, length) = INDEX_ENTRY.unpack_from(self.__index,
+                                                       entry_offset)
+            self.__blocks = self.__map(self.__blocks, self.__blocks_path,
+                                       offset + length)
+            block, _ = unpack_block(self.__blocks, offset,
+                                    self.__file_addresses)
+            self.__cache_block(index, block)
+            return block
+
+    def write_block(self, block):
+        """Write a block after the last block of the store."""
+        with self.__lock:
+            records = []
+            payload = pack_block(block, file_address_ids(
+                self.__file_ids, records, self.__file_addresses))
+            if records:
+                with open(self.__addresses_path, mode='ab') as f:
+                    f.write(b''.join(records))
+            with open(self.__blocks_path, mode='ab') as f:
+                offset = f.tell()
+                f.write(payload)
+            # The index entry is written last, so a block only counts once
+            # it was written completely
+            with open(self.__index_path, mode='ab') as f:
+                f.write(INDEX_ENTRY.pack(offset, len(payload)))
+            self.__cache_block(self.__length, block)
+            self.__length += 1
+
+    def snapshot(self, chain, open_transactions, peer_nodes):
+        """Rewrite all files with the given data and return the (lazy) chain
+        which reads from them."""
+        file_ids = {}
+        file_addresses = []
+        files = [self.__addresses_path, self.__blocks_path,
+                 self.__index_path]
+        # The new files replace the old ones once they are complete (the
+        # given chain may still read from the old ones)
+        with open(files[0] + '.tmp', mode='wb') as address_file, \
+                open(files[1] + '.tmp', mode='wb') as blocks_file, \
+                open(files[2] + '.tmp', mode='wb') as index_file:
+            address_file.write(MAGIC)
+            blocks_file.write(MAGIC)
+            offset = len(MAGIC)
+            for block in chain:
+                records = []
+                payload = pack_block(block, file_address_ids(
+                    file_ids, records, file_addresses))
+                address_file.write(b''.join(records))
+                blocks_file.write(payload)
+                index_file.write(INDEX_ENTRY.pack(offset, len(payload)))
+                offset += len(payload)
+        with self.__lock:
+            for path in files:
+                os.replace(path + '.tmp', path)
+            self.__file_ids = file_ids
+            self.__file_addresses = file_addresses
+            self.__cache = OrderedDict()
+            self.__blocks = None
+            self.__index = None
+            self.__length = len(chain)
+        self.__state.snapshot([], open_transactions, peer_nodes)
+        return LazyChain(self, self.__length)
+
+    def truncate(self, length, open_transactions, peer_nodes):
+        """Remove the blocks from index length on (e.g. the blocks of another
+        fork), replace the open transactions and the peer nodes and return the
+        (lazy) chain of the remaining blocks."""
+        with self.__lock:
+            if length < self.__length:
+                with open(self.__index_path, mode='r+b') as f:
+                    f.seek(length * INDEX_ENTRY.size)
+                    (offset, _) = INDEX_ENTRY.unpack(
+                        f.read(INDEX_ENTRY.size))
+                    f.truncate(length * INDEX_ENTRY.size)
+                # The blocks are removed after their index entries, so the
+                # index never points behind the end of the blocks file
+                with open(self.__blocks_path, mode='r+b') as f:
+                    f.truncate(offset)
+                for index in range(length, self.__length):
+                    self.__cache.pop(index, None)
+                self.__blocks = None
+                self.__index = None
+                self.__length = length
+        self.__state.snapshot([], open_transactions, peer_nodes)
+        return LazyChain(self, self.__length)
+
+    def append_block(self, block):
+        """Remove the open transactions confirmed by a new block (the block
+        itself was written when it was appended to the LazyChain)."""
+        state = self.__state.load()
+        if state is None:
+            return
+        (_, open_transactions, peer_nodes) = state
+        remaining = TransactionPool(open_transactions)
+        remaining.remove_confirmed(block)
+        if len(remaining) != len(open_transactions):
+            self.__state.snapshot([], list(remaining), peer_nodes)
+
+    def append_transaction(self, transaction):
+        """Append a new open transaction to the state file."""
+        self.__state.append_transaction(transaction)
+
+    def append_peer(self, node, removed=False):
+        """Append the addition (or removal) of a peer node to the state
+        file."""
+        self.__state.append_peer(node, removed)
+
+    def __cache_block(self, index, block):
+        self.__cache[index] = block
+        self.__cache.move_to_end(index)
+        if len(self.__cache) > BLOCK_CACHE_SIZE:
+            self.__cache.popitem(last=False)
+
+    def __load_addresses(self):
+        """Load (and intern) the addresses used by the blocks."""
+        self.__file_addresses = []
+        self.__file_ids = {}
+        try:
+            with open(self.__addresses_path, mode='rb') as f:
+                buffer = memoryview(f.read())
+        except IOError:
+            return
+        offset = len(MAGIC)
+        while offset + RECORD_HEADER.size <= len(buffer):
+            record_type, length = RECORD_HEADER.unpack_from(buffer, offset)
+            start = offset + RECORD_HEADER.size
+            if start + length > len(buffer) or record_type != ADDRESS:
+                break
+            offset = start + length
+            address, _ = unpack_value(buffer, start)
+            address_id = addresses.intern(address)
+            self.__file_ids[address_id] = len(self.__file_addresses)
+            self.__file_addresses.append(address_id)
+        # A half written (last) record is removed, so that later addresses
+        # are appended after the last complete one
+        if offset < len(buffer):
+            with open(self.__addresses_path, mode='r+b') as f:
+                f.truncate(offset)
+
+    @staticmethod
+    def __map(current, path, end):
+        """Return a (read-only) mapping of a file which covers at least end
+        bytes (the file is mapped again once it grew)."""
+        if current is not None and len(current) >= end:
+            return current
+        with open(path, mode='rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
@@ -0,0 +1,104 @@
+"""Provides the HTTP client which talks to peer nodes."""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import requests
+
+# The number of seconds to wait for a peer node to answer
+PEER_TIMEOUT = 5
+# The number of peer nodes which are contacted at the same time
+PEER_WORKERS = 8
+
+
+class PeerClient:
+    """Sends requests to peer nodes. Every peer gets its own HTTP session (so
+    connections are kept alive between requests) and broadcasts are sent to
+    all peers concurrently.
+
+    Attributes:
+        :timeout: The number of seconds to wait for a peer node to answer.
+    """
+
+    def __init__(self, timeout=PEER_TIMEOUT, max_workers=PEER_WORKERS):
+        self.timeout = timeout
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.__sessions = {}
+        self.__stats = {}
+        self.__lock = threading.Lock()
+
+    def __session(self, node):
+        with self.__lock:
+            if node not in self.__sessions:
+                self.__sessions[node] = requests.Session()
+            return self.__sessions[node]
+
+    def __record(self, node, latency, failed):
+        with self.__lock:
+            stats = self.__stats.setdefault(
+                node, {'requests': 0, 'failures': 0, 'total_latency': 0.0})
+            stats['requests'] += 1
+            stats['total_latency'] += latency
+            if failed:
+                stats['failures'] += 1
+
+    def request(self, node, method, path, **kwargs):
+        """Send a request to a peer node and return the response (None if
+        the peer couldn't be reached in time).
+
+        Arguments:
+            :node: The URL (host:port) of the peer node.
+            :method: The HTTP method.
+            :path: The path of the request (e.g. '/chain').
+        """
+        url = 'http://{}{}'.format(node, path)
+        start = time.time()
+        try:
+            response = self.__session(node).request(
+                method, url, timeout=self.timeout, **kwargs)
+        except requests.exceptions.RequestException:
+            self.__record(node, time.time() - start, True)
+            return None
+        self.__record(node, time.time() - start, response.status_code >= 500)
+        return response
+
+    def get(self, node, path, params=None):
+        """Send a GET request to a peer node (see request)."""
+        return self.request(node, 'GET', path, params=params)
+
+    def post(self, node, path, payload):
+        """Send a POST request with a JSON payload to a peer node (see
+        request)."""
+        return self.request(node, 'POST', path, json=payload)
+
+    def submit(self, function, *args):
+        """Run a function in the worker threads of the client and return its
+        future."""
+        return self.__executor.submit(function, *args)
+
+    def broadcast(self, nodes, path, payload):
+        """Send a POST request to all given peer nodes concurrently and return
+        a dictionary of their responses (None for unreachable peers).
+
+        Arguments:
+            :nodes: The URLs of the peer nodes.
+            :path: The path of the request.
+            :payload: The JSON payload.
+        """
+        futures = {node: self.submit(self.post, node, path, payload)
+                   for node in nodes}
+        return {node: future.result() for (node, future) in futures.items()}
+
+    def get_stats(self):
+        """Return the number of requests, failures and the average latency
+        (in seconds) per peer node."""
+        with self.__lock:
+            return {
+                node: {
+                    'requests': stats['requests'],
+                    'failures': stats['failures'],
+                    'average_latency': (stats['total_latency'] /
+                                        stats['requests'])
+                } for (node, stats) in self.__stats.items()
+            }
@@ -0,0 +1,40 @@
+"""Provides a cache of transactions with verified signatures."""
+
+from collections import OrderedDict
+
+# The number of verified transactions which are remembered
+SIGNATURE_CACHE_SIZE = 10000
+
+
+class SignatureCache:
+    """Remembers transactions whose signature was already verified so that
+    they don't need to be verified again (e.g. before mining them). The
+    oldest entries are evicted once the cache is full.
+
+    Attributes:
+        :max_size: The maximum number of remembered transactions.
+    """
+
+    def __init__(self, max_size=SIGNATURE_CACHE_SIZE):
+        self.max_size = max_size
+        self.__verified = OrderedDict()
+
+    def __len__(self):
+        return len(self.__verified)
+
+    def __contains__(self, transaction):
+        return transaction.id in self.__verified
+
+    def add(self, transaction):
+        """Remember a transaction with a verified signature."""
+        self.__verified[transaction.id] = True
+        if len(self.__verified) > self.max_size:
+            self.__verified.popitem(last=False)
+
+    def discard(self, transaction):
+        """Forget a transaction (e.g. after it was confirmed)."""
+        self.__verified.pop(transaction.id, None)
+
+    def clear(self):
+        """Forget all transactions."""
+        self.__verified.clear()
@@ -0,0 +1,72 @@
+"""Provides an index of the confirmed transactions by their ID."""
+
+import binascii
+
+from utility.block_file import BlockFile
+
+# The size of a (raw) transaction ID
+ID_SIZE = 32
+
+
+class TransactionIndex(BlockFile):
+    """Maps the IDs of the transactions in the chain to their locations (the
+    height of their block and their position in it), so that a confirmed
+    transaction can be found without scanning the chain.
+
+    The IDs are also kept in a block file (the entry of a block holds the
+    raw IDs of its transactions) which new blocks are appended to, so the
+    index doesn't have to be recalculated when a node starts.
+
+    Transactions with the same ID (e.g. the rewards of a miner who is
+    rewarded the same amount twice or repeated payments) are located at
+    every occurrence.
+
+    Attributes:
+        :path: The path of the index file.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        # The (height, position) tuple by the raw transaction IDs (or a list
+        # of them for IDs which occur more than once)
+        self.__locations = {}
+
+    def __len__(self):
+        return len(self.__locations)
+
+    def get_locations(self, transaction_id):
+        """Return the (height, position) tuples of the transactions with the
+        given (hex encoded) ID in the order of the chain (an empty list if
+        there is no such transaction)."""
+        try:
+            locations = self.__locations.get(
+                binascii.unhexlify(transaction_id))
+        except ValueError:
+            return []
+        if locations is None:
+            return []
+        if isinstance(locations, list):
+            return list(locations)
+        return [locations]
+
+    def _clear(self):
+        self.__locations = {}
+
+    def _load(self, height, raw_hash, data):
+        for (position, offset) in enumerate(range(0, len(data), ID_SIZE)):
+            self.__add(data[offset:offset + ID_SIZE], (height, position))
+
+    def _add(self, height, raw_hash, block):
+        data = b''.join(binascii.unhexlify(tx.id)
+                        for tx in block.transactions)
+        self._load(height, raw_hash, data)
+        return data
+
+    def __add(self, raw_id, location):
+        locations = self.__locations.get(raw_id)
+        if locations is None:
+            self.__locations[raw_id] = location
+        elif isinstance(locations, list):
+            locations.append(location)
+        else:
+            self.__locations[raw_id] = [locations, location]
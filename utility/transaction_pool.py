@@ -0,0 +1,63 @@
+"""Provides the pool of open transactions."""
+
+from collections import OrderedDict
+
+
+class TransactionPool:
+    """Keeps the open transactions in the order they were added and finds
+    them by their ID.
+
+    Signatures are deterministic, so repeated payments (with the same sender,
+    recipient and amount) have the same ID. They are all kept, and a
+    confirmed transaction only removes one of them.
+    """
+
+    def __init__(self, transactions=()):
+        # The transactions by a unique key: (transaction ID, sequence number)
+        self.__transactions = OrderedDict()
+        # The keys of the transactions by their ID (oldest first)
+        self.__keys = {}
+        self.__next = 0
+        for tx in transactions:
+            self.add(tx)
+
+    def __len__(self):
+        return len(self.__transactions)
+
+    def __iter__(self):
+        return iter(self.__transactions.values())
+
+    def add(self, transaction):
+        """Add an open transaction."""
+        key = (transaction.id, self.__next)
+        self.__next += 1
+        self.__transactions[key] = transaction
+        self.__keys.setdefault(transaction.id, []).append(key)
+
+    def get(self, transaction_id):
+        """Return the (oldest) open transaction with the given ID (None if
+        there is no such transaction)."""
+        keys = self.__keys.get(transaction_id)
+        if not keys:
+            return None
+        return self.__transactions[keys[0]]
+
+    def count(self, transaction_id):
+        """Return the number of open transactions with the given ID."""
+        return len(self.__keys.get(transaction_id, ()))
+
+    def remove(self, transaction_id):
+        """Remove the oldest open transaction with the given ID and return it
+        (None if there is no such transaction)."""
+        keys = self.__keys.get(transaction_id)
+        if not keys:
+            return None
+        key = keys.pop(0)
+        if not keys:
+            del self.__keys[transaction_id]
+        return self.__transactions.pop(key)
+
+    def remove_confirmed(self, block):
+        """Remove one open transaction for every transaction of a block."""
+        for tx in block.transactions:
+            self.remove(tx.id)
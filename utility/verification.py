@@ -1,8 +1,13 @@
 """Provides verification helper methods."""
 
-from utility.hash_util import hash_string_256, hash_block
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utility.hash_util import hash_string_256
 from wallet import Wallet
 
+# The number of blocks which are verified together by one process
+VERIFY_CHUNK_SIZE = 100
+
 
 class Verification:
     """A helper class which offer various static and class-based verification
@@ -41,7 +46,7 @@ class Verification:
         for (index, block) in enumerate(blockchain):
             if index == 0:
                 continue
-            if block.previous_hash != hash_block(blockchain[index - 1]):
+            if block.previous_hash != blockchain[index - 1].hash:
                 return False
             if not cls.valid_proof(block.transactions[:-1],
                                    block.previous_hash,
@@ -50,6 +55,44 @@ class Verification:
                 return False
         return True
 
+    @classmethod
+    def find_invalid_block(cls, blockchain, processes=1,
+                           chunk_size=VERIFY_CHUNK_SIZE):
+        """Verify the hashes, proofs of work and transaction signatures of a
+        whole chain and return the index of the first invalid block (None if
+        the chain is valid).
+
+        Arguments:
+            :blockchain: The blocks of the chain.
+            :processes: The number of processes the chain is verified with
+            (in chunks of blocks).
+            :chunk_size: The number of blocks per chunk.
+        """
+        if processes <= 1:
+            return _verify_blocks(blockchain, 0)
+        invalid_index = None
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            # Every chunk also gets the block before it to check the hash
+            futures = {
+                executor.submit(_verify_blocks,
+                                list(blockchain[start - 1:start + chunk_size]),
+                                start - 1): start
+                for start in range(1, len(blockchain), chunk_size)
+            }
+            for future in as_completed(futures):
+                # Cancelled chunks are completed as well
+                if future.cancelled():
+                    continue
+                index = future.result()
+                if index is not None and (invalid_index is None or
+                                          index < invalid_index):
+                    invalid_index = index
+                    # Chunks behind an invalid block don't matter anymore
+                    for other, start in futures.items():
+                        if start > index:
+                            other.cancel()
+        return invalid_index
+
     @staticmethod
     def verify_transaction(transaction, get_balance, check_funds=True):
         """Verify a transaction by checking whether the sender has sufficient coins.
@@ -69,3 +112,30 @@ class Verification:
         """Verifies all open transactions."""
         return all([cls.verify_transaction(tx, get_balance, False)
                     for tx in open_transactions])
+
+
+def _verify_blocks(blocks, first_index):
+    """Verify all but the first of the given (consecutive) blocks and return
+    the index of the first invalid one (None if all are valid).
+
+    Arguments:
+        :blocks: The blocks to verify, preceded by their previous block.
+        :first_index: The index of the first of the given blocks.
+    """
+    for offset in range(1, len(blocks)):
+        block = blocks[offset]
+        if block.previous_hash != blocks[offset - 1].hash:
+            return first_index + offset
+        # The last transaction is the mining reward (which isn't signed)
+        if not Verification.valid_proof(block.transactions[:-1],
+                                        block.previous_hash,
+                                        block.proof):
+            return first_index + offset
+        try:
+            if not all(Wallet.verify_transaction(tx)
+                       for tx in block.transactions[:-1]):
+                return first_index + offset
+        except (ValueError, TypeError, IndexError):
+            # The public key or signature couldn't be parsed
+            return first_index + offset
+    return None
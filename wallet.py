@@ -3,6 +3,21 @@ from Crypto.Signature import PKCS1_v1_5
 from Crypto.Hash import SHA256
 import Crypto.Random
 import binascii
+from functools import lru_cache
+
+# The number of public keys (and their verifiers) which are kept parsed
+VERIFIER_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=VERIFIER_CACHE_SIZE)
+def load_verifier(public_key):
+    """Parse a (hex encoded) public key and return a signature verifier for
+    it. The most recently used verifiers are cached.
+
+    Arguments:
+        :public_key: The hex encoded public key.
+    """
+    return PKCS1_v1_5.new(RSA.importKey(binascii.unhexlify(public_key)))
 
 
 class Wallet:
@@ -82,8 +97,19 @@ class Wallet:
         Arguments:
             :transaction: The transaction that should be verified.
         """
-        public_key = RSA.importKey(binascii.unhexlify(transaction.sender))
-        verifier = PKCS1_v1_5.new(public_key)
+        verifier = load_verifier(transaction.sender)
         h = SHA256.new((str(transaction.sender) + str(transaction.recipient) +
                         str(transaction.amount)).encode('utf8'))
         return verifier.verify(h, binascii.unhexlify(transaction.signature))
+
+    @staticmethod
+    def get_verifier_cache_info():
+        """Return the hit/miss counters and the size of the public key
+        cache."""
+        info = load_verifier.cache_info()
+        return {
+            'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'max_size': info.maxsize
+        }